@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from extended_plugin import Plugin
+from extended_plugin.JsonRpcConnection import _JsonRpcConnection
+
+_REQUEST_CANCELLED_CODE = -32800
+
+
+# Stands in for the stdio transport: FakeFlowHost feeds it and receives everything the plugin writes
+class MemoryTransport:
+    def __init__(self, on_message: Callable[[bytes], None]):
+        self.__incoming: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        self.__on_message = on_message
+
+    async def open(self):
+        pass
+
+    async def read_message(self) -> Optional[bytes]:
+        return await self.__incoming.get()
+
+    def write(self, message: bytes):
+        self.__on_message(message)
+
+    def write_parts(self, parts) -> int:
+        message = b"".join(parts)
+        self.__on_message(message)
+        return len(message) + 1
+
+    def close(self):
+        pass
+
+    def feed(self, message: bytes):
+        self.__incoming.put_nowait(message + b"\n")
+
+    def feed_eof(self):
+        self.__incoming.put_nowait(None)
+
+
+@dataclass
+class ReplayStats:
+    query_latencies: List[float] = field(default_factory=list)
+    query_result_counts: List[int] = field(default_factory=list)
+    context_menu_latencies: List[float] = field(default_factory=list)
+    queries_sent: int = 0
+    queries_completed: int = 0
+    queries_superseded: int = 0
+    errors: int = 0
+    updates: int = 0
+    messages: int = 0
+    bytes_received: int = 0
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Plays Flow Launcher's side of the connection for a plugin running on the same event loop
+class FakeFlowHost:
+    def __init__(self, plugin_type: Type[Plugin], cancel_superseded: bool = True):
+        self.stats = ReplayStats()
+        self.__cancel_superseded = cancel_superseded
+        self.__ids = itertools.count()
+        self.__pending: Dict[int, asyncio.Future] = {}
+        self.__sent_at: Dict[int, float] = {}
+        self.__last_query_id: Optional[int] = None
+        self.__transport = MemoryTransport(self.__on_message)
+        self.plugin = plugin_type(connection=_JsonRpcConnection(self.__transport))
+        self.__serve_task: Optional[asyncio.Task] = None
+
+    async def start(self, plugin_directory: str, icon_path: str = "icon.png"):
+        self.__serve_task = asyncio.create_task(self.plugin.serve())
+        await self.request("initialize", [{
+            "currentPluginMetadata": {
+                "id": "benchmark",
+                "name": type(self.plugin).__name__,
+                "author": "benchmark",
+                "version": "1.0.0",
+                "language": "python_v2",
+                "pluginDirectory": plugin_directory,
+                "executeFilePath": "",
+                "executeFileName": "main.py",
+                "actionKeyword": "*",
+                "actionKeywords": ["*"],
+                "icoPath": icon_path,
+                "website": "",
+                "description": "",
+                "disabled": False,
+            }
+        }])
+
+    async def stop(self):
+        if self.__pending:
+            await asyncio.gather(*self.__pending.values(), return_exceptions=True)
+        self.__transport.feed_eof()
+        await self.__serve_task
+
+    def request(self, method: str, params: List[Any]) -> asyncio.Future:
+        return self.__request(method, params)[1]
+
+    def __request(self, method: str, params: List[Any]) -> Tuple[int, asyncio.Future]:
+        request_id = next(self.__ids)
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = future
+        self.__sent_at[request_id] = time.perf_counter()
+        self.__send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        future.add_done_callback(lambda _: self.__pending.pop(request_id, None))
+        return request_id, future
+
+    def query(self, search: str, action_keyword: str = "") -> asyncio.Future:
+        # Flow cancels the query it is still waiting on before sending the next one
+        if self.__cancel_superseded and self.__last_query_id in self.__pending:
+            self.__send({"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": self.__last_query_id}})
+
+        raw = f"{action_keyword} {search}" if action_keyword else search
+        self.stats.queries_sent += 1
+        self.__last_query_id, future = self.__request("query", [{
+            "rawQuery": raw,
+            "isReQuery": False,
+            "search": search,
+            "searchTerms": [term for term in search.split(" ") if term],
+            "actionKeyword": action_keyword,
+        }, {}])
+        future.add_done_callback(self.__record_query)
+        return future
+
+    def context_menu(self, context_data: Any) -> asyncio.Future:
+        future = self.request("context_menu", [context_data])
+        future.add_done_callback(self.__record_context_menu)
+        return future
+
+    def __send(self, message: Dict[str, Any]):
+        self.__transport.feed(json.dumps(message).encode("utf-8"))
+        self.stats.messages += 1
+
+    def __on_message(self, data: bytes):
+        self.stats.messages += 1
+        self.stats.bytes_received += len(data)
+        message = json.loads(data)
+
+        if "method" in message:
+            if "id" in message:
+                # Host API calls made by the plugin get an empty answer
+                self.__send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+            elif message["method"] == "UpdateResults":
+                self.stats.updates += 1
+            return
+
+        future = self.__pending.get(message.get("id"))
+        if future is None or future.done():
+            return
+
+        message["latency"] = time.perf_counter() - self.__sent_at.pop(message["id"])
+        future.set_result(message)
+
+    def __record_query(self, future: asyncio.Future):
+        message = future.result()
+        error = message.get("error")
+        if error is not None and error.get("code") == _REQUEST_CANCELLED_CODE:
+            self.stats.queries_superseded += 1
+        elif error is not None:
+            self.stats.errors += 1
+        elif "result" not in (message.get("result") or {}):
+            # Queries that lose their debounce answer with an empty object
+            self.stats.queries_superseded += 1
+        elif not message["result"]["result"] and message["id"] != self.__last_query_id:
+            # Replaced by a newer query before they started, the plugin answers those with an empty list
+            self.stats.queries_superseded += 1
+        else:
+            self.stats.queries_completed += 1
+            self.stats.query_latencies.append(message["latency"])
+            self.stats.query_result_counts.append(len(message["result"]["result"] or ()))
+
+    def __record_context_menu(self, future: asyncio.Future):
+        message = future.result()
+        if message.get("error") is not None:
+            self.stats.errors += 1
+        else:
+            self.stats.context_menu_latencies.append(message["latency"])
@@ -0,0 +1,48 @@
+import inspect
+import timeit
+
+from extended_plugin import Plugin, Query
+from extended_plugin.CancellationToken import CancellationToken
+from extended_plugin.HandlerInvoker import _HandlerInvoker
+
+CALLS = 200_000
+
+
+class BenchmarkPlugin(Plugin):
+    def __init__(self):
+        # The benchmark only needs handlers to bind to, not a running connection
+        pass
+
+    def search(self, query, token):
+        return None
+
+
+def count_arguments_per_call(handler, query, token):
+    # What Plugin.query used to do for every query
+    argument_count = len([
+        param for param in inspect.signature(handler).parameters.values()
+        if param.kind in (param.POSITIONAL_OR_KEYWORD, param.POSITIONAL_ONLY)
+    ])
+    result = handler(query, token) if argument_count == 2 else handler(query)
+    if inspect.iscoroutinefunction(handler):
+        pass
+    return result
+
+
+def main():
+    plugin = BenchmarkPlugin()
+    handler = plugin.search
+    invoker = _HandlerInvoker.for_search(BenchmarkPlugin.search, is_method=True).bind(plugin)
+    query = Query(raw="q", is_requery=False, search="q", search_terms=["q"], action_keyword="")
+    token = CancellationToken()
+
+    baseline = timeit.timeit(lambda: handler(query, token), number=CALLS)
+    inspected = timeit.timeit(lambda: count_arguments_per_call(handler, query, token), number=CALLS)
+    precompiled = timeit.timeit(lambda: invoker.handler(*invoker.arguments(query, token, None)), number=CALLS)
+
+    for name, total in (("direct call", baseline), ("inspect per call", inspected), ("precompiled invoker", precompiled)):
+        print(f"{name:>20}: {total / CALLS * 1e9:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
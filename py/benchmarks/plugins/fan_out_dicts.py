@@ -0,0 +1,21 @@
+from extended_plugin import Plugin, Query
+
+
+def _result(title: str, subtitle: str, score: int):
+    # PascalCase, the way the demo plugin and most existing plugins write results
+    return {"Title": title, "SubTitle": subtitle, "Score": score, "IcoPath": "icon.png"}
+
+
+class FanOutDictsPlugin(Plugin):
+    fan_out = True
+    fan_out_timeout = 200
+
+    @Plugin.Search
+    def apps(self, query: Query):
+        return [_result(f"{query.search} app {index}", "Application", 100 - index) for index in range(10)]
+
+    @Plugin.Search
+    def files(self, query: Query):
+        # Overlaps with apps on the first results, which the merge keeps once at their best score
+        return [_result(f"{query.search} app {index}", "Application", index) for index in range(3)] + \
+            [_result(f"{query.search} file {index}", "File", 50 - index) for index in range(10)]
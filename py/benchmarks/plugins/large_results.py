@@ -0,0 +1,30 @@
+import functools
+
+from extended_plugin import Plugin, Query, Result, ResultPreview
+from extended_plugin.datatypes.ActionData import ActionData
+
+RESULT_COUNT = 2000
+
+
+class LargeResultsPlugin(Plugin):
+    @Plugin.Search
+    def search(self, query: Query):
+        return [
+            Result(
+                title=f"{query.search} match {index}",
+                subtitle=f"C:\\Users\\benchmark\\Documents\\file-{index}.txt",
+                icon_path="Images\\file.png",
+                score=RESULT_COUNT - index,
+                title_highlight_data=[0, 1, 2],
+                action=ActionData("Plugin.Action", "open", [index]),
+                preview=ResultPreview(description=f"Preview of file {index}", file_path=f"C:\\file-{index}.txt"),
+                context_menu=functools.partial(self.file_menu, index),
+            )
+            for index in range(RESULT_COUNT)
+        ]
+
+    def file_menu(self, index: int):
+        return [
+            Result(title="Open containing folder", action=ActionData("Plugin.Action", "reveal", [index])),
+            Result(title="Copy path", action=ActionData("Plugin.Action", "copy", [index])),
+        ]
@@ -0,0 +1,21 @@
+from extended_plugin import Plugin, Query, Result
+
+COMMAND_COUNT = 300
+
+
+def _make_command(index: int):
+    def command(self, query: Query):
+        return [Result(title=f"cmd{index}: {query.search}", score=100)]
+
+    command.__name__ = f"command_{index}"
+    return command
+
+
+class ManyPrefixesPlugin(Plugin):
+    @Plugin.Search
+    def fallback(self, query: Query):
+        return f"No command matches {query.search!r}"
+
+    for _index in range(COMMAND_COUNT):
+        locals()[f"command_{_index}"] = Plugin.Search(starts_with=f"cmd{_index} ")(_make_command(_index))
+    del _index
@@ -0,0 +1,23 @@
+from extended_plugin import Plugin, RegexQuery, Result
+
+UNIT_COUNT = 120
+
+
+def _make_conversion(unit: str):
+    def convert(self, query: RegexQuery):
+        amount = float(query.regex_matches.group(1))
+        return [Result(title=f"{amount} {unit}", subtitle=query.regex_matches.group(0), score=50)]
+
+    convert.__name__ = f"convert_{unit}"
+    return convert
+
+
+class RegexHeavyPlugin(Plugin):
+    @Plugin.Search
+    def fallback(self):
+        return "Type an amount followed by a unit"
+
+    for _index in range(UNIT_COUNT):
+        _unit = f"unit{_index}"
+        locals()[f"convert_{_unit}"] = Plugin.Search(regex=rf"(\d+(?:\.\d+)?)\s*{_unit}\b")(_make_conversion(_unit))
+    del _index, _unit
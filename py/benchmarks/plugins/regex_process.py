@@ -0,0 +1,27 @@
+from extended_plugin import Plugin, RegexQuery, Result
+
+UNIT_COUNT = 20
+
+
+def _make_conversion(unit: str):
+    # Runs in a pool worker, so it is a plain function and the query arrives pickled
+    def convert(query: RegexQuery):
+        amount = float(query.regex_matches.group("amount"))
+        return [Result(title=f"{amount} {unit}", subtitle=query.regex_matches.group(0), score=50)]
+
+    convert.__name__ = convert.__qualname__ = f"convert_{unit}"
+    globals()[convert.__name__] = convert
+    return convert
+
+
+class RegexProcessPlugin(Plugin):
+    process_pool_size = 2
+
+    @Plugin.Search
+    def fallback(self):
+        return "Type an amount followed by a unit"
+
+    for _index in range(UNIT_COUNT):
+        _unit = f"unit{_index}"
+        locals()[f"convert_{_unit}"] = Plugin.Search(regex=rf"(?P<amount>\d+(?:\.\d+)?)\s*{_unit}\b", execution="process")(_make_conversion(_unit))
+    del _index, _unit
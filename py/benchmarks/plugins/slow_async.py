@@ -0,0 +1,39 @@
+import asyncio
+
+from extended_plugin import Plugin, Query, Result
+
+
+async def _remote_source(name: str, query: Query, delay: float):
+    await asyncio.sleep(delay)
+    return [Result(title=f"{name}: {query.search} {index}", score=10 * index) for index in range(20)]
+
+
+class SlowAsyncPlugin(Plugin):
+    @Plugin.Search(debounce_delay=50)
+    async def search(self, query: Query):
+        await asyncio.sleep(0.08)
+        return [Result(title=f"{query.search} {index}", score=index) for index in range(50)]
+
+    @Plugin.Search(starts_with="web ")
+    def web(self, query: Query):
+        return [
+            Result(title=f"local: {query.search}", score=1000),
+            _remote_source("fast", query, 0.03),
+            _remote_source("slow", query, 0.2),
+        ]
+
+    @Plugin.Search(starts_with="feed ")
+    async def feed(self, query: Query):
+        yield Result(title=f"cached: {query.search}", score=1000)
+        for page in range(3):
+            await asyncio.sleep(0.05)
+            yield [Result(title=f"page {page}: {query.search} {index}", score=index) for index in range(10)]
+
+    @Plugin.Search(starts_with="calc ", adaptive_debounce=True)
+    def calculate(self, query: Query):
+        return Result(title=f"= {query.search}")
+
+    @Plugin.Search(starts_with="docs ", adaptive_debounce=True)
+    async def documents(self, query: Query):
+        await asyncio.sleep(0.15)
+        return [Result(title=f"document about {query.search} {index}", score=index) for index in range(30)]
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from .fake_host import FakeFlowHost, percentile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SCENARIOS = {
+    "many_prefixes": ("benchmarks.plugins.many_prefixes:ManyPrefixesPlugin", ["cmd42 open file", "cmd299 x", "cmd7 hello world"]),
+    "regex_heavy": ("benchmarks.plugins.regex_heavy:RegexHeavyPlugin", ["12 unit3", "7.5 unit119", "300 unit60"]),
+    "regex_process": ("benchmarks.plugins.regex_process:RegexProcessPlugin", ["12 unit3", "7.5 unit19", "300 unit10"]),
+    "large_results": ("benchmarks.plugins.large_results:LargeResultsPlugin", ["document", "report 2024"]),
+    "fan_out_dicts": ("benchmarks.plugins.fan_out_dicts:FanOutDictsPlugin", ["launcher", "notes 2024"]),
+    "slow_async": ("benchmarks.plugins.slow_async:SlowAsyncPlugin", ["weather", "web flow launcher", "feed news", "calc 12 + 7", "docs search engine"]),
+}
+
+
+def generate_keystrokes(phrases: List[str], seed: int = 0) -> List[Dict[str, Any]]:
+    # Typing gaps follow a rough human cadence: bursts of quick keys, the odd typo and a pause between phrases
+    rng = random.Random(seed)
+    events: List[Dict[str, Any]] = []
+
+    for phrase in phrases:
+        typed = ""
+        for char in phrase:
+            if rng.random() < 0.05:
+                events.append({"delay": _typing_gap(rng), "search": typed + rng.choice("qwertyuiop")})
+                events.append({"delay": _typing_gap(rng) * 1.5, "search": typed})
+            typed += char
+            events.append({"delay": _typing_gap(rng), "search": typed})
+
+        events.append({"delay": rng.uniform(300, 700), "context_menu": True})
+        for _ in range(len(phrase)):
+            typed = typed[:-1]
+            events.append({"delay": rng.uniform(25, 45), "search": typed})
+        events.append({"delay": rng.uniform(300, 700), "search": ""})
+
+    return events
+
+
+def _typing_gap(rng: random.Random) -> float:
+    return min(350.0, max(25.0, rng.gauss(110, 45)))
+
+
+def load_keystrokes(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def load_plugin_type(reference: str):
+    module_name, class_name = reference.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+async def replay(plugin_type, events: List[Dict[str, Any]], speed: float = 1.0, trace_memory: bool = False) -> Dict[str, Any]:
+    if trace_memory:
+        tracemalloc.start()
+
+    host = FakeFlowHost(plugin_type)
+    with tempfile.TemporaryDirectory() as plugin_directory:
+        await host.start(plugin_directory)
+
+        started = time.perf_counter()
+        last_result: Optional[asyncio.Future] = None
+        for event in events:
+            await asyncio.sleep(event["delay"] / 1000 / speed)
+            if event.get("context_menu"):
+                context_data = _first_context_data(last_result)
+                if context_data is not None:
+                    host.context_menu(context_data)
+            else:
+                last_result = host.query(event["search"])
+
+        await host.stop()
+        elapsed = time.perf_counter() - started
+
+    stats = host.stats
+    report = {
+        "queries": stats.queries_sent,
+        "completed": stats.queries_completed,
+        "superseded": stats.queries_superseded,
+        "errors": stats.errors,
+        "updates": stats.updates,
+        "results_p50": percentile(stats.query_result_counts, 50),
+        "p50_ms": _milliseconds(percentile(stats.query_latencies, 50)),
+        "p95_ms": _milliseconds(percentile(stats.query_latencies, 95)),
+        "p99_ms": _milliseconds(percentile(stats.query_latencies, 99)),
+        "context_menu_p50_ms": _milliseconds(percentile(stats.context_menu_latencies, 50)),
+        "messages_per_second": round(stats.messages / elapsed, 1),
+        "received_kib": round(stats.bytes_received / 1024, 1),
+        "peak_traced_kib": None,
+        "peak_rss_kib": None,
+    }
+
+    if trace_memory:
+        report["peak_traced_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["peak_rss_kib"] = peak // 1024 if sys.platform == "darwin" else peak
+
+    return report
+
+
+def _first_context_data(future: Optional[asyncio.Future]) -> Optional[Any]:
+    if future is None or not future.done():
+        return None
+    result = future.result().get("result") or {}
+    for item in result.get("result") or []:
+        if "contextData" in item:
+            return item["contextData"]
+    return None
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def run_scenario(name: str, events: Optional[List[Dict[str, Any]]], speed: float, trace_memory: bool, seed: int) -> Dict[str, Any]:
+    reference, phrases = SCENARIOS[name]
+    if events is None:
+        events = generate_keystrokes(phrases, seed)
+    return asyncio.run(replay(load_plugin_type(reference), events, speed, trace_memory))
+
+
+def print_table(reports: Dict[str, Dict[str, Any]]):
+    columns = ["queries", "completed", "superseded", "errors", "updates", "results_p50", "p50_ms", "p95_ms", "p99_ms",
+               "context_menu_p50_ms", "messages_per_second", "received_kib", "peak_traced_kib", "peak_rss_kib"]
+    width = max(len(name) for name in reports) + 2
+    print("scenario".ljust(width) + " ".join(column.rjust(max(len(column), 9)) for column in columns))
+    for name, report in reports.items():
+        cells = ["-" if report.get(column) is None else str(report[column]) for column in columns]
+        print(name.ljust(width) + " ".join(cell.rjust(max(len(column), 9)) for cell, column in zip(cells, columns)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay keystroke sequences against synthetic plugins through an in-process fake Flow host.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--keystrokes", help="JSON file with recorded {delay, search | context_menu} events")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated keystroke sequences")
+    parser.add_argument("--memory", action="store_true", help="trace Python allocations (slows the replay down)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    events = load_keystrokes(args.keystrokes) if args.keystrokes else None
+
+    if args.in_process:
+        reports = {name: run_scenario(name, events, args.speed, args.memory, args.seed) for name in names}
+    else:
+        # Every scenario gets a fresh interpreter so peak memory and registered handlers do not carry over
+        reports = {}
+        for name in names:
+            command = [sys.executable, "-m", "benchmarks.replay", name, "--in-process", "--json",
+                       "--speed", str(args.speed), "--seed", str(args.seed)]
+            if args.keystrokes:
+                command += ["--keystrokes", args.keystrokes]
+            if args.memory:
+                command.append("--memory")
+            output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+            reports.update(json.loads(output.stdout))
+
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        print_table(reports)
+
+
+if __name__ == "__main__":
+    main()
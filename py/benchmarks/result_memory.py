@@ -0,0 +1,62 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+from extended_plugin import Query, Result
+from extended_plugin.datatypes.ActionData import ActionData
+from extended_plugin.ResultMapper import _make_results
+
+RESULT_COUNT = 100_000
+QUERY_COUNT = 100_000
+
+
+def build_results():
+    return [
+        Result(
+            title=f"document {index}.txt",
+            subtitle=f"C:\\Users\\flow\\Documents\\document {index}.txt",
+            score=index % 100,
+            action=ActionData("open", "open_file", [index]),
+        )
+        for index in range(RESULT_COUNT)
+    ]
+
+
+def build_queries():
+    # What the plugin builds per keystroke, without any handler reading the derived fields
+    return [Query._from_host(raw=f"q {index}", is_requery=False, action_keyword="q", source=f"  q {index} term  ", starting_index=2) for index in range(QUERY_COUNT)]
+
+
+def measure(name, build):
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+
+    # Tracing slows allocations down a lot, so sizes come from a second, untimed build
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # A full collection has to walk everything that is still alive, which is what typing pauses on
+    started = time.perf_counter()
+    gc.collect()
+    collection = time.perf_counter() - started
+
+    count = len(objects)
+    print(f"{name:>18}: {size / count:8.0f} B/object  peak {peak / 1024 / 1024:7.1f} MiB  build {elapsed * 1000:8.1f} ms  full gc {collection * 1000:6.1f} ms")
+    return objects
+
+
+def main():
+    print(f"Python {sys.version.split()[0]}, {RESULT_COUNT} results, {QUERY_COUNT} queries")
+    results = measure("Result", build_results)
+    measure("converted results", lambda: _make_results(results))
+    measure("Query", build_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,69 @@
+import asyncio
+from typing import Callable, List, Optional
+
+
 class CancellationToken:
     def __init__(self):
         self.__cancelled = False
+        self.__callbacks: List[Callable[[], None]] = []
+        self.__waiters: List[asyncio.Future] = []
 
     def cancel(self):
+        if self.__cancelled:
+            return
         self.__cancelled = True
 
+        callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+        waiters, self.__waiters = self.__waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(self.__wake, waiter)
+
     @property
     def is_cancelled(self):
-        return self.__cancelled
\ No newline at end of file
+        return self.__cancelled
+
+    def raise_if_cancelled(self):
+        if self.is_cancelled:
+            raise asyncio.CancelledError()
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        if self.__cancelled:
+            callback()
+            return lambda: None
+
+        self.__callbacks.append(callback)
+
+        def unregister():
+            try:
+                self.__callbacks.remove(callback)
+            except ValueError:
+                pass
+
+        return unregister
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        if self.__cancelled:
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.__waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if waiter in self.__waiters:
+                self.__waiters.remove(waiter)
+
+        return self.__cancelled
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
@@ -0,0 +1,90 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Optional
+
+_MAGIC = b"EPDS\x01"
+_HEADER_LENGTH = struct.Struct(">I")
+_MISSING_SOURCE = -1
+
+
+class _Snapshot:
+    __slots__ = ("version", "sources", "created", "data")
+
+    def __init__(self, version: Any, sources: Dict[str, int], created: float, data: Any):
+        self.version = version
+        self.sources = sources
+        self.created = created
+        self.data = data
+
+    def is_stale(self, sources: Dict[str, int], max_age: Optional[int] = None) -> bool:
+        if sources != self.sources:
+            return True
+        return max_age is not None and time.time() - self.created > max_age / 1000  # Convert milliseconds to seconds
+
+
+def _source_mtimes(paths: Iterable[str]) -> Dict[str, int]:
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = _MISSING_SOURCE
+    return mtimes
+
+
+def _read_snapshot(path: str, version: Any) -> Optional[_Snapshot]:
+    try:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(_MAGIC)] != _MAGIC:
+                return None
+
+            start = len(_MAGIC) + _HEADER_LENGTH.size
+            (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(_MAGIC))
+            header = json.loads(mapped[start:start + header_length])
+            # A loader with a different version may not even unpickle the old data, so it is not read at all
+            if header.get("version") != version:
+                return None
+
+            # Unpickled straight from the mapping, without copying the file into memory first
+            view = memoryview(mapped)
+            body = view[start + header_length:]
+            try:
+                data = pickle.loads(body)
+            finally:
+                body.release()
+                view.release()
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, struct.error, AttributeError, ImportError):
+        return None
+
+    return _Snapshot(header["version"], header.get("sources", {}), header.get("created", 0.0), data)
+
+
+def _write_snapshot(path: str, snapshot: _Snapshot):
+    header = json.dumps({
+        "version": snapshot.version,
+        "sources": snapshot.sources,
+        "created": snapshot.created,
+    }).encode("utf-8")
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(_MAGIC)
+            file.write(_HEADER_LENGTH.pack(len(header)))
+            file.write(header)
+            pickle.dump(snapshot.data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Readers either see the previous snapshot or the complete new one
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
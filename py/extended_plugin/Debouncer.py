@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Optional
+
+from .CancellationToken import CancellationToken
+
+_DEFAULT_MAX_ADAPTIVE_DELAY = 300
+# Handlers faster than this always run straight away
+_FAST_HANDLER = 0.015
+_SMOOTHING = 0.3
+# Keystrokes further apart than this are not part of the same burst of typing
+_MAX_TYPING_GAP = 1.0
+
+
+class _TypingCadence:
+    __slots__ = ("typical_gap", "last_gap", "__last_keystroke")
+
+    def __init__(self):
+        self.typical_gap: Optional[float] = None
+        self.last_gap: Optional[float] = None
+        self.__last_keystroke: Optional[float] = None
+
+    def observe(self):
+        now = time.monotonic()
+        if self.__last_keystroke is not None:
+            self.last_gap = gap = now - self.__last_keystroke
+            if gap < _MAX_TYPING_GAP:
+                self.typical_gap = gap if self.typical_gap is None else self.typical_gap + _SMOOTHING * (gap - self.typical_gap)
+        self.__last_keystroke = now
+
+    @property
+    def in_burst(self) -> bool:
+        return self.last_gap is not None and self.typical_gap is not None and self.last_gap < 2 * self.typical_gap
+
+
+class _Debouncer:
+    __slots__ = ("__delay", "__adaptive", "__latency", "__timer", "__waiter")
+
+    def __init__(self, delay: Optional[int] = None, adaptive: bool = False):
+        if delay is None:
+            delay = _DEFAULT_MAX_ADAPTIVE_DELAY if adaptive else 0
+        self.__delay = delay / 1000  # Convert milliseconds to seconds
+        self.__adaptive = adaptive
+        self.__latency: Optional[float] = None
+        self.__timer: Optional[asyncio.TimerHandle] = None
+        self.__waiter: Optional[asyncio.Future] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self.__latency
+
+    def record_latency(self, seconds: float, completed: bool = True):
+        # A cancelled run only says the handler takes at least this long
+        if not completed and self.__latency is not None and seconds <= self.__latency:
+            return
+        self.__latency = seconds if self.__latency is None else self.__latency + _SMOOTHING * (seconds - self.__latency)
+
+    def delay_for(self, cadence: _TypingCadence) -> float:
+        if not self.__adaptive:
+            return self.__delay
+
+        # Unknown latency runs immediately, which is also how it gets measured
+        latency = self.__latency
+        if latency is None or latency < _FAST_HANDLER or not cadence.in_burst:
+            return 0.0
+        if latency < cadence.typical_gap / 2:
+            return 0.0
+        # Wait out roughly one more keystroke, the next one would cancel this run anyway
+        return min(self.__delay, cadence.typical_gap * 1.5)
+
+    async def wait(self, token: CancellationToken, cadence: _TypingCadence) -> bool:
+        if token.is_cancelled:
+            return False
+
+        delay = self.delay_for(cadence)
+        if delay <= 0:
+            return True
+
+        # One timer per handler: a query still waiting here has been superseded by this one
+        self.__release(False)
+        loop = asyncio.get_running_loop()
+        waiter = self.__waiter = loop.create_future()
+        self.__timer = loop.call_later(delay, self.__release, True)
+        try:
+            return await waiter and not token.is_cancelled
+        finally:
+            if self.__waiter is waiter:
+                self.__timer.cancel()
+                self.__timer = self.__waiter = None
+
+    def __release(self, run: bool):
+        waiter, timer = self.__waiter, self.__timer
+        self.__waiter = self.__timer = None
+        if timer is not None:
+            timer.cancel()
+        if waiter is not None and not waiter.done():
+            waiter.set_result(run)
@@ -0,0 +1,111 @@
+import asyncio
+import atexit
+import functools
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence
+
+from .CancellationToken import CancellationToken
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, ThreadPoolExecutor
+
+EXECUTION_INLINE = "inline"
+EXECUTION_THREAD = "thread"
+EXECUTION_PROCESS = "process"
+EXECUTION_MODES = (EXECUTION_INLINE, EXECUTION_THREAD, EXECUTION_PROCESS)
+
+_CANCELLATION_SLOTS = 256
+
+# Set in every process pool worker by _initialize_worker
+_worker_cancellation_flags = None
+
+
+class _SharedCancellationToken(CancellationToken):
+    def __init__(self, flags, slot: int):
+        super().__init__()
+        self.__flags = flags
+        self.__slot = slot
+
+    @property
+    def is_cancelled(self):
+        return bool(self.__flags[self.__slot])
+
+
+def _initialize_worker(flags):
+    global _worker_cancellation_flags
+    _worker_cancellation_flags = flags
+
+
+def _invoke_in_worker(func: Callable, args: List[Any], token_index: Optional[int], slot: int) -> Any:
+    if token_index is not None:
+        args[token_index] = _SharedCancellationToken(_worker_cancellation_flags, slot)
+    return func(*args)
+
+
+class _ExecutorPools:
+    def __init__(self, thread_pool_size: Optional[int] = None, process_pool_size: Optional[int] = None):
+        self.__thread_pool_size = thread_pool_size
+        self.__process_pool_size = process_pool_size
+        self.__thread_pool: Optional["ThreadPoolExecutor"] = None
+        self.__process_pool: Optional["Executor"] = None
+        self.__cancellation_flags = None
+        self.__free_slots: List[int] = []
+        atexit.register(self.shutdown)
+
+    @property
+    def thread_pool(self) -> "Executor":
+        if self.__thread_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.__thread_pool = ThreadPoolExecutor(max_workers=self.__thread_pool_size, thread_name_prefix="search-handler")
+        return self.__thread_pool
+
+    @property
+    def process_pool(self) -> "Executor":
+        if self.__process_pool is None:
+            # Process pool support is imported on first use, most plugins never need it
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Workers see cancellation through one shared byte per in-flight call
+            self.__cancellation_flags = multiprocessing.Array("b", _CANCELLATION_SLOTS, lock=False)
+            self.__free_slots = list(range(_CANCELLATION_SLOTS))
+            self.__process_pool = ProcessPoolExecutor(
+                max_workers=self.__process_pool_size,
+                initializer=_initialize_worker,
+                initargs=(self.__cancellation_flags,),
+            )
+        return self.__process_pool
+
+    async def run_in_thread(self, func: Callable, args: Sequence[Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.thread_pool, functools.partial(func, *args))
+
+    async def run_in_process(self, func: Callable, args: Sequence[Any], token: CancellationToken, token_index: Optional[int]) -> Any:
+        pool = self.process_pool
+        if not self.__free_slots:
+            raise RuntimeError("Too many search handlers are running in the process pool")
+
+        slot = self.__free_slots.pop()
+        self.__cancellation_flags[slot] = 0
+        unregister = token.register(functools.partial(self.__cancellation_flags.__setitem__, slot, 1))
+
+        # The token itself cannot be pickled, the worker rebuilds one around the shared flag
+        worker_args = list(args)
+        if token_index is not None:
+            worker_args[token_index] = None
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, _invoke_in_worker, func, worker_args, token_index, slot)
+        finally:
+            unregister()
+            self.__free_slots.append(slot)
+
+    def shutdown(self):
+        if self.__thread_pool is not None:
+            self.__thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.__thread_pool = None
+
+        if self.__process_pool is not None:
+            for slot in range(_CANCELLATION_SLOTS):
+                self.__cancellation_flags[slot] = 1
+            self.__process_pool.shutdown(wait=True, cancel_futures=True)
+            self.__process_pool = None
@@ -0,0 +1,54 @@
+import heapq
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from .ResultMapper import _get_field, _get_score, _top_results
+from .datatypes.Result import Result
+from .datatypes.SearchResults import SearchResults
+
+
+class _FanOut:
+    def __init__(self, limits: Sequence[Optional[int]], max_results: Optional[int], publish: Callable[[List[Any]], None]):
+        self.__limits = limits
+        self.__max_results = max_results
+        self.__publish = publish
+        self.__partials: List[Optional[SearchResults]] = [None] * len(limits)
+
+    def partial(self, index: int) -> Optional[SearchResults]:
+        return self.__partials[index]
+
+    def update(self, index: int, items: List[Any]):
+        # A streaming source only knows its own results, the host is sent everything found so far
+        self.__partials[index] = items
+        self.__publish(self.merge(self.__partials))
+
+    def merge(self, sources: Sequence[Optional[SearchResults]]) -> List[Any]:
+        return _merge_results([_top_results(source, limit) for source, limit in zip(sources, self.__limits)], self.__max_results)
+
+
+def _merge_results(sources: Sequence[Optional[SearchResults]], max_results: Optional[int] = None) -> List[Any]:
+    best: Dict[Hashable, Any] = {}
+    for source in sources:
+        if source is None:
+            continue
+        for value in source if isinstance(source, (list, tuple)) else (source,):
+            if value is None:
+                continue
+            # Duplicates from several sources keep their best score
+            key = _result_key(value)
+            current = best.get(key)
+            if current is None or _get_score(value) > _get_score(current):
+                best[key] = value
+
+    merged = list(best.values())
+    if max_results is not None and len(merged) > max_results:
+        return heapq.nlargest(max_results, merged, key=_get_score)
+    # Stable, so equal scores stay in handler priority order
+    return sorted(merged, key=_get_score, reverse=True)
+
+
+def _result_key(value: Any) -> Hashable:
+    if isinstance(value, Result):
+        return value.title, value.subtitle
+    if isinstance(value, dict):
+        return _get_field(value, "title"), _get_field(value, "subtitle")
+    return str(value), None
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from .JsonRpcConnection import _JsonRpcConnection
+from .datatypes.Metadata import Metadata
+from .datatypes.SearchResults import SearchResults
+
+
+class FlowApi:
+    def __init__(
+            self,
+            connection: _JsonRpcConnection,
+            metadata: Metadata,
+            make_results: Callable[[SearchResults], List[Dict[str, Any]]],
+            timeout: Optional[float] = None,
+    ):
+        self.__connection = connection
+        self.__metadata = metadata
+        self.__make_results = make_results
+        self.__timeout = timeout
+
+    def with_timeout(self, timeout: Optional[float]) -> "FlowApi":
+        # Same connection, different deadline (in milliseconds) for every call made through the copy
+        return FlowApi(self.__connection, self.__metadata, self.__make_results, timeout)
+
+    async def call(self, method: str, *params: Any) -> Any:
+        return await self.__connection.send_request(method, list(params), self.__timeout)
+
+    async def change_query(self, query: str, requery: bool = True) -> None:
+        return await self.call("ChangeQuery", query, requery)
+
+    async def restart_app(self) -> None:
+        return await self.call("RestartApp")
+
+    async def shell_run(self, cmd: str, filename: str = "cmd.exe") -> None:
+        return await self.call("ShellRun", cmd, filename)
+
+    async def copy_to_clipboard(self, text: str, copy_file: bool = False, show_default_notification: bool = False) -> None:
+        return await self.call("CopyToClipboard", text, copy_file, show_default_notification)
+
+    async def save_all_app_settings(self) -> None:
+        return await self.call("SaveAppAllSettings")
+
+    async def save_all_plugin_settings(self) -> None:
+        return await self.call("SavePluginSettings")
+
+    async def reload_all_plugin_data(self) -> None:
+        return await self.call("ReloadAllPluginData")
+
+    async def check_for_updates(self) -> None:
+        return await self.call("CheckForNewUpdate")
+
+    async def show_error_message(self, title: str, subtitle: str = "") -> None:
+        return await self.call("ShowMsgError", title, subtitle)
+
+    async def show_main_window(self) -> None:
+        return await self.call("ShowMainWindow")
+
+    async def hide_main_window(self) -> None:
+        return await self.call("HideMainWindow")
+
+    async def is_main_window_visible(self) -> bool:
+        return await self.call("IsMainWindowVisible")
+
+    async def show_message(self, title: str, subtitle: str = "", icon_path: str = "", use_main_window_as_owner: bool = True) -> None:
+        return await self.call("ShowMsg", title, subtitle, icon_path, use_main_window_as_owner)
+
+    async def open_settings_window(self) -> None:
+        return await self.call("OpenSettingDialog")
+
+    async def get_translation(self, key: str) -> str:
+        return await self.call("GetTranslation", key)
+
+    async def get_all_plugins(self) -> List[Any]:
+        return await self.call("GetAllPlugins")
+
+    async def fuzzy_search(self, needle: str, haystack: str) -> Any:
+        return await self.call("FuzzySearch", needle, haystack)
+
+    async def http_get_string(self, url: str) -> str:
+        return await self.call("HttpGetStringAsync", url)
+
+    async def http_get_json(self, url: str, query: Optional[str] = None) -> Any:
+        if query:
+            url += quote(query, safe="")
+        return json.loads(await self.http_get_string(url))
+
+    async def http_download(self, url: str, file_path: str) -> None:
+        return await self.call("HttpDownloadAsync", url, file_path)
+
+    async def add_action_keyword(self, keyword: str, plugin_id: Optional[str] = None) -> None:
+        return await self.call("AddActionKeyword", plugin_id or self.__metadata.id, keyword)
+
+    async def remove_action_keyword(self, keyword: str, plugin_id: Optional[str] = None) -> None:
+        return await self.call("RemoveActionKeyword", plugin_id or self.__metadata.id, keyword)
+
+    async def is_action_keyword_assigned(self, keyword: str) -> bool:
+        return await self.call("ActionKeywordAssigned", keyword)
+
+    async def log_debug(self, class_name: str, message: str, method_name: str = "") -> None:
+        return await self.call("LogDebug", class_name, message, method_name)
+
+    async def log_info(self, class_name: str, message: str, method_name: str = "") -> None:
+        return await self.call("LogInfo", class_name, message, method_name)
+
+    async def log_warn(self, class_name: str, message: str, method_name: str = "") -> None:
+        return await self.call("LogWarn", class_name, message, method_name)
+
+    async def open_directory(self, directory_path: str, file_name_or_file_path: Optional[str] = None) -> None:
+        return await self.call("OpenDirectory", directory_path, file_name_or_file_path)
+
+    async def open_url(self, url: str, incognito: Optional[bool] = None) -> None:
+        return await self.call("OpenUrl", url, incognito)
+
+    async def open_app_uri(self, uri: str) -> None:
+        return await self.call("OpenAppUri", uri)
+
+    async def toggle_game_mode(self) -> None:
+        return await self.call("ToggleGameMode")
+
+    async def set_game_mode(self, value: bool) -> None:
+        return await self.call("SetGameMode", value)
+
+    async def is_game_mode_on(self) -> bool:
+        return await self.call("IsGameModeOn")
+
+    async def re_query(self, reselect: bool = False) -> None:
+        return await self.call("ReQuery", reselect)
+
+    async def update_results(self, raw_query: str, results: SearchResults) -> None:
+        # A notification like the ones streamed handlers send, the host answers UpdateResults with nothing worth waiting for
+        self.__connection.send_notification("UpdateResults", [raw_query, { "result": self.__make_results(results) }])
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from .RpcLogging import _logger
+
+FRAMING_AUTO = "auto"
+FRAMING_NEWLINE = "newline"
+FRAMING_CONTENT_LENGTH = "content-length"
+FRAMINGS = (FRAMING_AUTO, FRAMING_NEWLINE, FRAMING_CONTENT_LENGTH)
+
+_CONTENT_LENGTH_HEADER = b"content-length:"
+_MAX_HEADER_LINES = 32
+_NEWLINE = b"\n"
+
+Chunk = Union[bytes, memoryview]
+
+
+class _NewlineFraming:
+    # One message per line, what Flow Launcher speaks
+    name = FRAMING_NEWLINE
+
+    async def read(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        line = await reader.readline()
+        # Blank lines carry no message, the decoder would only warn about them; isspace does not copy a large line like strip
+        while line.isspace():
+            line = await reader.readline()
+        return line if line else None
+
+    def frame(self, message: bytes) -> Tuple[Chunk, ...]:
+        # Written as two chunks, so a large message is not copied just to append the newline
+        return message, _NEWLINE
+
+    def frame_parts(self, parts: Iterable[Chunk]) -> Iterator[Chunk]:
+        yield from parts
+        yield _NEWLINE
+
+
+class _ContentLengthFraming:
+    # LSP style headers: the body is read by its length, without scanning it for a delimiter
+    name = FRAMING_CONTENT_LENGTH
+
+    async def read(self, reader: asyncio.StreamReader, first_line: Optional[bytes] = None) -> Optional[bytes]:
+        length = None
+        line = first_line if first_line is not None else await reader.readline()
+        for _ in range(_MAX_HEADER_LINES):
+            if not line:
+                return None
+            if not line.strip():
+                if length is not None:
+                    break
+                # Blank lines between messages
+            elif line[:len(_CONTENT_LENGTH_HEADER)].lower() == _CONTENT_LENGTH_HEADER:
+                try:
+                    length = int(line[len(_CONTENT_LENGTH_HEADER):])
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    _logger.warning("Invalid Content-Length header %r", line)
+                    return None
+            line = await reader.readline()
+        else:
+            _logger.warning("No message body after %d header lines", _MAX_HEADER_LINES)
+            return None
+
+        try:
+            return await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+
+    def frame(self, message: bytes) -> Tuple[Chunk, ...]:
+        return _header(len(message)), message
+
+    def frame_parts(self, parts: Iterable[Chunk]) -> Iterator[Chunk]:
+        # The header needs the total length, so the parts are collected first but still not joined
+        parts = list(parts)
+        yield _header(sum(map(len, parts)))
+        yield from parts
+
+
+class _DetectedFraming:
+    # Decided by the first message the host sends; until then anything written is newline framed
+    name = FRAMING_AUTO
+
+    def __init__(self):
+        self.__framing: Union[_NewlineFraming, _ContentLengthFraming, None] = None
+
+    async def read(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        if self.__framing is not None:
+            return await self.__framing.read(reader)
+
+        line = await reader.readline()
+        while line.isspace():
+            line = await reader.readline()
+        if line[:len(_CONTENT_LENGTH_HEADER)].lower() == _CONTENT_LENGTH_HEADER:
+            self.__framing = _ContentLengthFraming()
+            _logger.debug("Host uses Content-Length framing")
+            return await self.__framing.read(reader, line)
+        if not line:
+            return None
+        self.__framing = _NewlineFraming()
+        return line
+
+    def frame(self, message: bytes) -> Tuple[Chunk, ...]:
+        return (self.__framing or _NewlineFraming()).frame(message)
+
+    def frame_parts(self, parts: Iterable[Chunk]) -> Iterator[Chunk]:
+        return (self.__framing or _NewlineFraming()).frame_parts(parts)
+
+
+Framing = Union[_NewlineFraming, _ContentLengthFraming, _DetectedFraming]
+
+
+def _create_framing(name: str) -> Framing:
+    if name == FRAMING_AUTO:
+        return _DetectedFraming()
+    if name == FRAMING_NEWLINE:
+        return _NewlineFraming()
+    if name == FRAMING_CONTENT_LENGTH:
+        return _ContentLengthFraming()
+    raise ValueError(f"framing must be one of {', '.join(FRAMINGS)}, not {name!r}")
+
+
+def _header(length: int) -> bytes:
+    return b"Content-Length: %d\r\n\r\n" % length
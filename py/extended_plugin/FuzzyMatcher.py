@@ -0,0 +1,303 @@
+import bisect
+import dataclasses
+import heapq
+import re
+from typing import Any, Callable, Dict, Generic, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+
+from .datatypes.Query import Query
+from .datatypes.Result import Result
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+T = TypeVar("T")
+
+# Scores fall into bands so a substring match always outranks an acronym match, which outranks a fuzzy one
+_SUBSTRING_SCORE = 75
+_ACRONYM_SCORE = 50
+_FUZZY_SCORE = 10
+
+_SEPARATOR = "\x00"
+_MASK_BITS = 63
+
+
+class FuzzyMatch(NamedTuple):
+    item: Any
+    score: int
+    highlight_data: List[int]
+
+
+class FuzzyMatcher(Generic[T]):
+    def __init__(
+            self,
+            items: Iterable[T],
+            key: Optional[Callable[[T], str]] = None,
+            to_result: Optional[Callable[[T], Result]] = None,
+            use_numpy: Optional[bool] = None,
+    ):
+        self.__items: List[T] = list(items)
+        self.__key = key or _default_key
+        self.__to_result = to_result
+        self.__use_numpy = numpy is not None if use_numpy is None else use_numpy and numpy is not None
+
+        titles = [self.__key(item).replace(_SEPARATOR, " ") for item in self.__items]
+        folded = [_fold(title) for title in titles]
+
+        # All titles live in one string so a term is found in every title with a single scan
+        self.__corpus = _SEPARATOR.join(folded)
+        self.__starts: List[int] = []
+        self.__lengths: List[int] = []
+        self.__acronyms: List[Tuple[str, Tuple[int, ...]]] = []
+        self.__masks: List[int] = []
+        word_starts = bytearray(len(self.__corpus))
+
+        offset = 0
+        for title, folded_title in zip(titles, folded):
+            positions = _word_starts(title)
+            for position in positions:
+                word_starts[offset + position] = 1
+            self.__starts.append(offset)
+            self.__lengths.append(len(folded_title))
+            self.__acronyms.append(("".join(folded_title[position] for position in positions), positions))
+            self.__masks.append(_char_mask(folded_title))
+            offset += len(folded_title) + 1
+
+        self.__word_starts = word_starts
+        self.__survivors: Optional[Tuple[int, Sequence[int]]] = None
+
+        if self.__use_numpy:
+            self.__np_starts = numpy.array(self.__starts, dtype=numpy.int64)
+            self.__np_lengths = numpy.array(self.__lengths, dtype=numpy.float64)
+            self.__np_masks = numpy.array(self.__masks, dtype=numpy.uint64)
+            self.__np_word_starts = numpy.frombuffer(bytes(word_starts), dtype=numpy.uint8).astype(bool)
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def search(self, query: Union[Query, str], limit: Optional[int] = 50) -> List[Result]:
+        results = []
+        for match in self.matches(query, limit):
+            if self.__to_result is not None:
+                result = self.__to_result(match.item)
+                result.score = match.score
+                result.title_highlight_data = match.highlight_data
+            elif isinstance(match.item, Result):
+                result = dataclasses.replace(match.item, score=match.score, title_highlight_data=match.highlight_data)
+            else:
+                result = Result(title=self.__key(match.item), score=match.score, title_highlight_data=match.highlight_data)
+            results.append(result)
+        return results
+
+    def matches(self, query: Union[Query, str], limit: Optional[int] = 50) -> List[FuzzyMatch]:
+        search_terms = query.search_terms if isinstance(query, Query) else query.split()
+        terms = list(dict.fromkeys(_fold(term) for term in search_terms if term))
+        if not terms or not self.__items:
+            return []
+
+        if self.__use_numpy:
+            ranked = self.__rank_numpy(terms, limit)
+        else:
+            ranked = self.__rank_python(terms, limit)
+
+        matches = []
+        for index, score in ranked:
+            highlight_data = sorted({position for term in terms for position in self.__match_term(index, term)[1]})
+            matches.append(FuzzyMatch(self.__items[index], round(score), highlight_data))
+        return matches
+
+    def __rank_python(self, terms: List[str], limit: Optional[int]) -> List[Tuple[int, float]]:
+        term_scores = [self.__substring_scores_python(term) for term in terms]
+        scores = term_scores[0]
+        for other in term_scores[1:]:
+            scores = {index: min(score, other[index]) for index, score in scores.items() if index in other}
+
+        if limit is None or len(scores) < limit:
+            for index in self.__prefilter(terms):
+                if index not in scores:
+                    score = self.__fuzzy_score(index, terms, term_scores)
+                    if score is not None:
+                        scores[index] = score
+
+        return _top(scores.items(), limit)
+
+    def __substring_scores_python(self, term: str) -> Dict[int, float]:
+        starts, lengths, word_starts = self.__starts, self.__lengths, self.__word_starts
+        term_length = len(term)
+        scores: Dict[int, float] = {}
+        for match in re.finditer(re.escape(term), self.__corpus):
+            offset = match.start()
+            index = bisect.bisect_right(starts, offset) - 1
+            score = _substring_score(offset - starts[index], word_starts[offset], term_length, lengths[index])
+            if score > scores.get(index, 0):
+                scores[index] = score
+        return scores
+
+    def __rank_numpy(self, terms: List[str], limit: Optional[int]) -> List[Tuple[int, float]]:
+        term_scores = [self.__substring_scores_numpy(term) for term in terms]
+        scores = term_scores[0]
+        for other in term_scores[1:]:
+            scores = numpy.minimum(scores, other)
+
+        if limit is None or numpy.count_nonzero(scores) < limit:
+            scores = scores.copy()
+            for index in self.__prefilter(terms):
+                if not scores[index]:
+                    score = self.__fuzzy_score(index, terms, term_scores)
+                    if score is not None:
+                        scores[index] = score
+
+        matched = numpy.flatnonzero(scores)
+        if limit is not None and len(matched) > limit:
+            # argpartition would pick arbitrarily among equal scores at the cut, a stable sort keeps the earlier items
+            matched = matched[numpy.argsort(-scores[matched], kind="stable")[:limit]]
+        return _top(zip(matched.tolist(), scores[matched].tolist()), limit)
+
+    def __substring_scores_numpy(self, term: str):
+        scores = numpy.zeros(len(self.__items), dtype=numpy.float64)
+        offsets = numpy.fromiter((match.start() for match in re.finditer(re.escape(term), self.__corpus)), dtype=numpy.int64)
+        if not len(offsets):
+            return scores
+
+        indices = numpy.searchsorted(self.__np_starts, offsets, side="right") - 1
+        positions = offsets - self.__np_starts[indices]
+        word_start = self.__np_word_starts[offsets]
+        occurrence_scores = (
+            _SUBSTRING_SCORE
+            + 10 * word_start
+            + 10 * (positions == 0)
+            + 5 * len(term) / self.__np_lengths[indices]
+            - ~word_start * numpy.minimum(positions, 10) * 0.5
+        )
+
+        # Offsets come out of the scan in order, so every title's occurrences form one run
+        unique, first = numpy.unique(indices, return_index=True)
+        scores[unique] = numpy.maximum.reduceat(occurrence_scores, first)
+        return scores
+
+    def __prefilter(self, terms: List[str]) -> Sequence[int]:
+        mask = 0
+        for term in terms:
+            mask |= _char_mask(term)
+
+        # A longer query only ever narrows the previous survivors down, so typing forward rescans less
+        survivors = self.__survivors
+        if survivors is not None and survivors[0] & mask == survivors[0]:
+            candidates = survivors[1]
+        else:
+            candidates = range(len(self.__items))
+
+        if self.__use_numpy:
+            if survivors is None or candidates is not survivors[1]:
+                candidates = numpy.arange(len(self.__items))
+            selected = candidates[(self.__np_masks[candidates] & numpy.uint64(mask)) == numpy.uint64(mask)]
+            self.__survivors = (mask, selected)
+            return selected.tolist()
+
+        masks = self.__masks
+        selected = [index for index in candidates if masks[index] & mask == mask]
+        self.__survivors = (mask, selected)
+        return selected
+
+    def __fuzzy_score(self, index: int, terms: List[str], term_scores: List[Any]) -> Optional[float]:
+        score = None
+        for term, substring_scores in zip(terms, term_scores):
+            term_score = substring_scores.get(index, 0) if isinstance(substring_scores, dict) else substring_scores[index]
+            if not term_score:
+                match = self.__match_term(index, term, substring=False)
+                if match is None:
+                    return None
+                term_score = match[0]
+            score = term_score if score is None else min(score, term_score)
+        return score
+
+    def __match_term(self, index: int, term: str, substring: bool = True) -> Optional[Tuple[float, List[int]]]:
+        start, length = self.__starts[index], self.__lengths[index]
+        folded = self.__corpus[start:start + length]
+        word_starts = self.__word_starts
+        term_length = len(term)
+
+        if substring:
+            best = None
+            position = folded.find(term)
+            while position >= 0:
+                score = _substring_score(position, word_starts[start + position], term_length, length)
+                if best is None or score > best[0]:
+                    best = (score, position)
+                position = folded.find(term, position + 1)
+            if best is not None:
+                return best[0], list(range(best[1], best[1] + term_length))
+
+        acronym, positions = self.__acronyms[index]
+        position = acronym.find(term) if term_length > 1 else -1
+        if position >= 0:
+            score = _ACRONYM_SCORE + 10 * term_length / len(acronym) + 5 * (position == 0)
+            return score, list(positions[position:position + term_length])
+
+        matched = []
+        position = 0
+        for char in term:
+            position = folded.find(char, position)
+            if position < 0:
+                return None
+            matched.append(position)
+            position += 1
+
+        span = matched[-1] - matched[0] + 1
+        at_word_start = sum(word_starts[start + position] for position in matched)
+        return _FUZZY_SCORE + 30 * term_length / span + 9 * at_word_start / term_length, matched
+
+
+def _default_key(item: Any) -> str:
+    if isinstance(item, Result):
+        return item.title or ""
+    return str(item)
+
+
+def _fold(text: str) -> str:
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded
+    # Highlight offsets index into the original title, so characters that expand when folded stay as they are
+    return "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+def _word_starts(title: str) -> Tuple[int, ...]:
+    positions = []
+    previous = ""
+    for index, char in enumerate(title):
+        if char.isalnum() and (
+                not previous.isalnum()
+                or (char.isupper() and previous.islower())
+                or char.isdigit() != previous.isdigit()
+        ):
+            positions.append(index)
+        previous = char
+    return tuple(positions)
+
+
+def _char_mask(text: str) -> int:
+    mask = 0
+    for char in set(text):
+        if "a" <= char <= "z":
+            mask |= 1 << (ord(char) - 97)
+        elif "0" <= char <= "9":
+            mask |= 1 << (ord(char) - 22)
+        elif not char.isspace():
+            mask |= 1 << (36 + ord(char) % (_MASK_BITS - 36))
+    return mask
+
+
+def _substring_score(position: int, word_start: int, term_length: int, title_length: int) -> float:
+    score = _SUBSTRING_SCORE + 10 * word_start + 10 * (position == 0) + 5 * term_length / title_length
+    if not word_start:
+        score -= min(position, 10) * 0.5
+    return score
+
+
+def _top(scores: Iterable[Tuple[int, float]], limit: Optional[int]) -> List[Tuple[int, float]]:
+    # Ties keep catalog order
+    if limit is None:
+        return sorted(scores, key=lambda entry: (-entry[1], entry[0]))
+    return heapq.nsmallest(limit, scores, key=lambda entry: (-entry[1], entry[0]))
@@ -0,0 +1,92 @@
+import inspect
+import re
+from typing import Any, Callable, Optional, Tuple, Type, Union
+
+from .datatypes import _OriginalQueryData
+from .datatypes.Query import Query
+from .datatypes.RegexQuery import RegexQuery
+
+_MAX_ARGUMENT_COUNT = 3
+
+
+class _HandlerInvoker:
+    __slots__ = ("handler", "argument_count", "is_async", "is_async_generator", "execution", "query_type")
+
+    # Everything inspect can tell about a handler is worked out once, when it is decorated
+    def __init__(
+            self,
+            handler: Callable,
+            argument_count: int,
+            is_async: bool,
+            is_async_generator: bool,
+            execution: Optional[str],
+            query_type: Type[Query],
+    ):
+        self.handler = handler
+        self.argument_count = argument_count
+        self.is_async = is_async
+        self.is_async_generator = is_async_generator
+        self.execution = execution
+        self.query_type = query_type
+
+    @classmethod
+    def for_search(cls, func: Callable, is_method: bool, execution: Optional[str] = None, is_regex: bool = False) -> "_HandlerInvoker":
+        argument_count = _count_positional_arguments(func) - (1 if is_method else 0)
+        if argument_count > _MAX_ARGUMENT_COUNT:
+            raise TypeError(f"Search handler {func.__qualname__} takes {argument_count} arguments, at most {_MAX_ARGUMENT_COUNT} are supported (query, token, candidates)")
+
+        return cls(
+            handler=func,
+            argument_count=max(argument_count, 0),
+            is_async=inspect.iscoroutinefunction(func),
+            is_async_generator=inspect.isasyncgenfunction(func),
+            execution=execution,
+            query_type=RegexQuery if is_regex else Query,
+        )
+
+    def bind(self, instance: object) -> "_HandlerInvoker":
+        return _HandlerInvoker(
+            self.handler.__get__(instance),
+            self.argument_count,
+            self.is_async,
+            self.is_async_generator,
+            self.execution,
+            self.query_type,
+        )
+
+    def arguments(self, query: Query, token: Any, candidates: Any) -> Tuple[Any, ...]:
+        return (query, token, candidates)[:self.argument_count]
+
+    def make_query(self, original_query: _OriginalQueryData, starting_index: Optional[int] = None, regex_match: Optional[re.Match] = None) -> Union[Query, RegexQuery]:
+        if self.query_type is RegexQuery and regex_match is not None:
+            return RegexQuery._from_host(
+                raw=original_query['rawQuery'],
+                is_requery=original_query['isReQuery'],
+                action_keyword=original_query['actionKeyword'],
+                source=original_query['search'],
+                starting_index=starting_index or 0,
+                regex_matches=regex_match
+            )
+        else:
+            return Query._from_host(
+                raw=original_query['rawQuery'],
+                is_requery=original_query['isReQuery'],
+                action_keyword=original_query['actionKeyword'],
+                source=original_query['search'],
+                starting_index=starting_index or 0
+            )
+
+
+class _RequestInvoker:
+    __slots__ = ("handler", "is_async")
+
+    def __init__(self, handler: Callable):
+        self.handler = handler
+        self.is_async = inspect.iscoroutinefunction(handler)
+
+
+def _count_positional_arguments(func: Callable) -> int:
+    return len([
+        param for param in inspect.signature(func).parameters.values()
+        if param.kind in (param.POSITIONAL_OR_KEYWORD, param.POSITIONAL_ONLY)
+    ])
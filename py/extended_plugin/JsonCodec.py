@@ -0,0 +1,45 @@
+import json
+from typing import Any, Union
+
+from .ResultJsonEncoder import ResultJsonEncoder
+from .datatypes.ActionData import ActionData
+
+
+class _JsonCodec:
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, cls=ResultJsonEncoder, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class _OrjsonCodec(_JsonCodec):
+    name = "orjson"
+
+    def __init__(self, orjson):
+        self.__dumps = orjson.dumps
+        self.__loads = orjson.loads
+        # orjson would otherwise serialize dataclasses such as ActionData field by field
+        self.__options = orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.__dumps(obj, default=_encode_default, option=self.__options)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self.__loads(data)
+
+
+def _encode_default(obj: Any) -> Any:
+    if isinstance(obj, ActionData):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _create_codec() -> _JsonCodec:
+    try:
+        import orjson
+    except ImportError:
+        return _JsonCodec()
+    return _OrjsonCodec(orjson)
@@ -1,15 +1,29 @@
-import logging
-import sys
-from typing import Any, List, TypedDict, Optional
-import json
-import inspect
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, TypedDict, Optional, Set, Dict, Tuple
 import asyncio
-from .ResultJsonEncoder import ResultJsonEncoder
+import time
+from .HandlerInvoker import _RequestInvoker
+from .JsonRpcError import JsonRpcError, RequestTimeoutError
+from .RpcLogging import _logger, _log_payload
+from .Transport import _Transport
+from .StartupTimings import _startup_timings
+from .Metrics import _metrics
 
-logging.basicConfig(
-    filename="D:/log/log.log",
-    level=logging.INFO,
-)
+if TYPE_CHECKING:
+    from .JsonCodec import _JsonCodec
+    from .RequestScheduler import _RequestScheduler
+
+_CANCEL_REQUEST_METHOD = "$/cancelRequest"
+_REQUEST_CANCELLED_CODE = -32800
+_SERVER_BUSY_CODE = -32000
+_STARTUP_COMPLETE_METHOD = "query"
+_DEFAULT_REQUEST_TIMEOUT = 30000
+_DEFAULT_MAX_PENDING_REQUESTS = 256
+_DEFAULT_MAX_QUEUED_REQUESTS = 1024
+_DEFAULT_MAX_ACTIVE_REQUESTS = 64
+# What a query replaced by a newer one before it started is answered with
+_SUPERSEDED_RESULT = {"result": []}
+# Result lists longer than this are encoded and written in slices of this many results
+_STREAM_BATCH_SIZE = 256
 
 class Request(TypedDict):
     id: int
@@ -19,99 +33,301 @@ class Request(TypedDict):
     params: List[Any]
 
 class _JsonRpcConnection:
-    def __init__(self):
+    request_timeout: Optional[float] = _DEFAULT_REQUEST_TIMEOUT
+    max_pending_requests: int = _DEFAULT_MAX_PENDING_REQUESTS
+    max_queued_requests: int = _DEFAULT_MAX_QUEUED_REQUESTS
+    max_active_requests: int = _DEFAULT_MAX_ACTIVE_REQUESTS
+    # Off by default: Flow Launcher's StreamJsonRpc host does not accept batch arrays
+    batch_requests: bool = False
+
+    def __init__(self, transport: Optional[_Transport] = None, codec: Optional["_JsonCodec"] = None):
         self._id = 0
-        self._requests = dict()
-        self._pending_requests = dict()
+        self._requests: Dict[str, _RequestInvoker] = dict()
+        self._arrival_observers: Dict[str, Callable[[], None]] = dict()
+        self._pending_requests: Dict[int, Tuple[str, asyncio.Future]] = dict()
+        self._pending_slots: Optional[asyncio.Semaphore] = None
+        self._outgoing_batch: List[Dict[str, Any]] = []
+        if transport is None:
+            from .StdioTransport import _StdioTransport
+            transport = _StdioTransport()
+        if codec is None:
+            # The codec probes for orjson, which is only worth it once the plugin is actually started
+            from .JsonCodec import _create_codec
+            codec = _create_codec()
+        self._transport = transport
+        self._codec = codec
+        self._tasks: Set[asyncio.Task] = set()
+        self._request_tasks: Dict[Any, asyncio.Task] = dict()
+        # Requests the host cancelled itself; anything else cancelled was superseded by the plugin
+        self._host_cancelled: Set[Any] = set()
+        self._scheduler: Optional["_RequestScheduler"] = None
+        self._active_slots: Optional[asyncio.Semaphore] = None
 
     async def listen(self):
-        for line in sys.stdin:
-            await self._process_incoming_data(line)
+        from .RequestScheduler import _RequestScheduler
 
-    async def _process_incoming_data(self, data: str):
+        await self._transport.open()
+        _startup_timings.mark("listen")
+        self._scheduler = _RequestScheduler(self.max_queued_requests)
+        self._active_slots = asyncio.Semaphore(max(1, self.max_active_requests))
+        dispatcher = asyncio.create_task(self._dispatch_requests())
         try:
-            logging.info("REQUEST:" + data)
-            obj: Request = json.loads(data)
-            if 'id' in obj and obj['id'] in self._pending_requests and 'method' not in obj:
-                future = self._pending_requests[obj['id']]
-                del self._pending_requests[obj['id']]
-
-                if obj['error'] is not None:
-                    future.set_exception(obj['error'])
-                else:
-                    future.set_result(obj['result'])
+            # Buffered messages are read without yielding, so the scheduler sees a whole burst before any of it is dispatched
+            while True:
+                message = await self._transport.read_message()
+                if message is None:
+                    break
+                await self._process_incoming_data(message)
+
+            self._scheduler.close()
+            await dispatcher
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            dispatcher.cancel()
+            self._transport.close()
+
+    async def _dispatch_requests(self):
+        while True:
+            # The slot is taken before a request is picked, so one that arrives meanwhile can still replace or overtake it
+            await self._active_slots.acquire()
+            request = await self._scheduler.get()
+            if request is None:
+                break
+            self._start_request(request)
+
+    async def _process_incoming_data(self, data: bytes):
+        try:
+            _log_payload("REQUEST", data)
+            obj = self._codec.loads(data)
+        except Exception:
+            _logger.warning("Could not decode incoming message", exc_info=True)
+            return
+
+        # A batch is an array of messages that are handled exactly as if they had arrived one by one
+        for message in obj if isinstance(obj, list) else (obj,):
+            await self._process_message(message)
+
+    async def _process_message(self, obj: Request):
+        try:
+            # Responses and cancellations skip the queue, a handler may be waiting on the host
+            if 'method' not in obj:
+                self._resolve_response(obj)
+            elif obj.get('method') == _CANCEL_REQUEST_METHOD:
+                self._cancel_request(obj.get('params'))
             else:
-                await self._handle_request(obj)
-        except:
-            pass
+                observer = self._arrival_observers.get(obj.get('method'))
+                if observer is not None:
+                    # Called as the message is read, before the scheduler gets a chance to coalesce it away
+                    observer()
+                try:
+                    superseded = self._scheduler.put(obj)
+                except OverflowError as e:
+                    # _QueueFullError, caught by its base class so the scheduler is only imported by listen()
+                    if 'id' in obj:
+                        self._send_error(obj['id'], str(e), _SERVER_BUSY_CODE)
+                    return
+                if superseded is not None and 'id' in superseded:
+                    self._send_response(superseded['id'], _SUPERSEDED_RESULT)
+        except Exception:
+            _logger.warning("Could not process incoming message", exc_info=True)
+
+    def _start_request(self, obj: Request):
+        task = None
+        try:
+            # Each request runs as its own task so a slow handler never holds up the messages behind it
+            task = asyncio.create_task(self._run_request(obj))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: self._active_slots.release())
+            if 'id' in obj:
+                request_id = obj['id']
+                self._request_tasks[request_id] = task
+                task.add_done_callback(lambda _: self._finish_request(request_id))
+        except Exception:
+            _logger.warning("Could not start request %s", obj.get('method'), exc_info=True)
+            if task is None:
+                # Without a task nothing else gives the slot back
+                self._active_slots.release()
+
+    def _resolve_response(self, obj: Request):
+        pending = self._pending_requests.pop(obj.get('id'), None)
+        if pending is None:
+            # Answers to requests that already timed out or were cancelled
+            _logger.debug("Dropping response to unknown request %s", obj.get('id'))
+            return
+
+        method, future = pending
+        if future.done():
+            return
+        if obj.get('error') is not None:
+            future.set_exception(JsonRpcError.from_error(obj['error'], method))
+        else:
+            future.set_result(obj.get('result'))
+
+    def _finish_request(self, request_id: Any):
+        task = self._request_tasks.pop(request_id, None)
+        host_cancelled = request_id in self._host_cancelled
+        self._host_cancelled.discard(request_id)
+        if task is not None and task.cancelled():
+            # Cancelled before it started running, so _handle_request never got to answer it
+            _metrics.increment("rpc.cancelled_before_start")
+            self._send_cancelled(request_id, host_cancelled)
+
+    def _cancel_request(self, params: Any):
+        request_id = params.get('id') if isinstance(params, dict) else params[0] if isinstance(params, list) and params else None
+        if self._scheduler is not None and self._scheduler.remove(request_id) is not None:
+            _metrics.increment("rpc.cancelled_before_start")
+            self._send_error(request_id, "Request cancelled", _REQUEST_CANCELLED_CODE)
+            return
+        task = self._request_tasks.get(request_id)
+        if task is not None:
+            self._host_cancelled.add(request_id)
+            task.cancel()
+
+    async def _run_request(self, request: Request):
+        try:
+            await self._handle_request(request)
+        except Exception:
+            _logger.exception("Unhandled error in %s", request.get('method'))
 
     async def _handle_request(self, request: Request):
-        logging.info("REQUEST:" + str(request))
-        logging.info("REQUEST_ID:" + str('id' in request))
         if 'method' in request and request['method'] in self._requests:
-            handler = self._requests[request['method']]
+            invoker: _RequestInvoker = self._requests[request['method']]
             if 'id' in request:
+                metric = f"rpc.{request['method']}"
+                _metrics.increment(f"{metric}.requests")
+                started = time.perf_counter()
                 try:
-                    if inspect.iscoroutinefunction(handler):
-                        result = await handler(*request['params'])
+                    if invoker.is_async:
+                        result = await invoker.handler(*request['params'])
                     else:
-                        result = handler(*request['params'])
-                    self._send_response(request['id'], result)
+                        result = invoker.handler(*request['params'])
+                    _metrics.observe_duration(f"{metric}.handle", time.perf_counter() - started)
+                    self._send_response(request['id'], result, metric)
+                    if _startup_timings.mark(request['method']) and request['method'] == _STARTUP_COMPLETE_METHOD:
+                        _logger.info("Startup timings in ms: %s", _startup_timings.report())
+                except asyncio.CancelledError:
+                    _metrics.increment(f"{metric}.cancelled")
+                    self._send_cancelled(request['id'], request['id'] in self._host_cancelled)
                 except Exception as e:
-                    logging.error("ERROR:" + str(e))
+                    _logger.exception("Request %s failed", request['method'])
+                    _metrics.increment(f"{metric}.errors")
                     self._send_error(request['id'], str(e))
             else:
-                if inspect.iscoroutinefunction(handler):
-                    await handler(*request['params'])
+                if invoker.is_async:
+                    await invoker.handler(*request['params'])
                 else:
-                    handler(*request['params'])
+                    invoker.handler(*request['params'])
         else:
             if 'id' in request:
                 self._send_response(request['id'], {'hi': 'hi'})
 
     def on_request(self, method: str, handler):
-        self._requests[method] = handler
+        self._requests[method] = _RequestInvoker(handler)
 
-    def _send_response(self, id: int, result: Any):
-        response = json.dumps({
-            'jsonrpc': '2.0',
-            'id': id,
-            'result': result
-        }, cls=ResultJsonEncoder)
-        logging.info("RESPONSE:" + response)
-        self._write_message(response)
+    def on_arrival(self, method: str, observer: Callable[[], None]):
+        self._arrival_observers[method] = observer
+
+    def _send_response(self, id: int, result: Any, metric: Optional[str] = None):
+        started = time.perf_counter()
+        results = result.get('result') if isinstance(result, dict) and len(result) == 1 else None
+        if isinstance(results, list) and len(results) > _STREAM_BATCH_SIZE:
+            # Every slice is encoded before the first is written, a result that fails to encode must not leave half a line behind
+            size = self._transport.write_parts(list(self._encode_results_response(id, results)))
+        else:
+            response = self._codec.dumps({
+                'jsonrpc': '2.0',
+                'id': id,
+                'result': result
+            })
+            _log_payload("RESPONSE", response)
+            self._write_message(response)
+            size = len(response)
+        if metric is not None:
+            _metrics.observe_duration(f"{metric}.serialize", time.perf_counter() - started)
+            _metrics.observe_size(f"{metric}.response_bytes", size)
+
+    def _encode_results_response(self, id: int, results: List[Any]) -> Iterator[bytes]:
+        # Same bytes as encoding {"result": results} in one go, but in slices the writer thread sends without joining them first
+        head = b'{"jsonrpc":"2.0","id":' + self._codec.dumps(id) + b',"result":{"result":['
+        _log_payload("RESPONSE", head)
+        yield head
+        for start in range(0, len(results), _STREAM_BATCH_SIZE):
+            if start:
+                yield b","
+            # Slices of the encoded array without its brackets, viewed rather than copied
+            yield memoryview(self._codec.dumps(results[start:start + _STREAM_BATCH_SIZE]))[1:-1]
+        yield b"]}}"
+
+    def _send_cancelled(self, id: int, host_cancelled: bool):
+        # Only a $/cancelRequest from the host gets the cancellation error, superseded queries are answered like the queued ones
+        if host_cancelled:
+            self._send_error(id, "Request cancelled", _REQUEST_CANCELLED_CODE)
+        else:
+            self._send_response(id, _SUPERSEDED_RESULT)
 
-    def _send_error(self, id: int, error: str):
-        response = json.dumps({
+    def _send_error(self, id: int, error: str, code: int = -32603):
+        response = self._codec.dumps({
             'jsonrpc': '2.0',
             'id': id,
-            'error': { 'code': -32603, 'message': error}
+            'error': { 'code': code, 'message': error}
         })
         self._write_message(response)
 
-    async def send_request(self, method: str, params: List[Any]):
-        request_id = self._id
-        self._id += 1
+    async def send_request(self, method: str, params: List[Any], timeout: Optional[float] = None):
+        timeout = self.request_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._send_request(method, params), timeout / 1000 if timeout is not None else None)  # Convert milliseconds to seconds
+        except asyncio.TimeoutError:
+            raise RequestTimeoutError(method, timeout) from None
+
+    async def _send_request(self, method: str, params: List[Any]):
+        if self._pending_slots is None:
+            self._pending_slots = asyncio.Semaphore(self.max_pending_requests)
+
+        # Waiting for a free slot counts towards the timeout, so a stuck host cannot pile up callers either
+        async with self._pending_slots:
+            request_id = self._id
+            self._id += 1
+
+            future = asyncio.get_running_loop().create_future()
+            self._pending_requests[request_id] = (method, future)
+
+            try:
+                self._write_request({
+                    'jsonrpc': '2.0',
+                    'id': request_id,
+                    'method': method,
+                    'params': params
+                })
+                return await future
+            finally:
+                self._pending_requests.pop(request_id, None)
 
-        future = asyncio.get_running_loop().create_future()
-        self._pending_requests[request_id] = future
+    def _write_request(self, request: Dict[str, Any]):
+        if not self.batch_requests:
+            self._write_message(self._codec.dumps(request))
+            return
 
-        request_payload = json.dumps({
+        # Requests made during the same loop iteration leave together as one batch
+        self._outgoing_batch.append(request)
+        if len(self._outgoing_batch) == 1:
+            asyncio.get_running_loop().call_soon(self._flush_batch)
+
+    def _flush_batch(self):
+        batch, self._outgoing_batch = self._outgoing_batch, []
+        if batch:
+            self._write_message(self._codec.dumps(batch if len(batch) > 1 else batch[0]))
+
+    def send_notification(self, method: str, params: List[Any]):
+        notification = self._codec.dumps({
             'jsonrpc': '2.0',
-            'id': request_id,
             'method': method,
             'params': params
         })
+        _log_payload("NOTIFICATION", notification)
+        self._write_message(notification)
 
-        self._write_message(request_payload)
-
-        try:
-            response = await future
-            return response
-        except Exception as e:
-            raise e
-
-    @staticmethod
-    def _write_message(message: str):
-        sys.stdout.write(message + '\n')
-        sys.stdout.flush()
\ No newline at end of file
+    def _write_message(self, message: bytes):
+        self._transport.write(message)
\ No newline at end of file
@@ -0,0 +1,22 @@
+from typing import Any, Optional
+
+
+class JsonRpcError(Exception):
+    def __init__(self, message: str, code: int = -32603, data: Optional[Any] = None, method: Optional[str] = None):
+        super().__init__(f"{method} failed: {message}" if method else message)
+        self.message = message
+        self.code = code
+        self.data = data
+        self.method = method
+
+    @classmethod
+    def from_error(cls, error: Any, method: Optional[str] = None) -> "JsonRpcError":
+        if isinstance(error, dict):
+            return cls(str(error.get("message", "Unknown error")), error.get("code", -32603), error.get("data"), method)
+        return cls(str(error), method=method)
+
+
+class RequestTimeoutError(JsonRpcError, TimeoutError):
+    def __init__(self, method: str, timeout: float):
+        super().__init__(f"no response within {timeout:g} ms", method=method)
+        self.timeout = timeout
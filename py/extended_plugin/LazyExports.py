@@ -0,0 +1,34 @@
+import importlib
+import sys
+import types
+from typing import Dict
+
+
+class _LazyExportsModule(types.ModuleType):
+    _lazy_exports: Dict[str, str]
+
+    def __getattr__(self, name: str):
+        module_name = self._lazy_exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module_name, self.__name__), name)
+        super().__setattr__(name, value)
+        return value
+
+    def __setattr__(self, name: str, value):
+        # Importing a submodule binds it on the package, which would shadow the export of the same name
+        if isinstance(value, types.ModuleType) and name in self._lazy_exports:
+            return
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self._lazy_exports))
+
+
+def _install_lazy_exports(module_name: str, exports: Dict[str, str]):
+    module = sys.modules[module_name]
+    module.__dict__["_lazy_exports"] = exports
+    # An explicit __all__ wins, the exports only stand in for a package that does not spell one out
+    module.__dict__.setdefault("__all__", list(exports))
+    module.__class__ = _LazyExportsModule
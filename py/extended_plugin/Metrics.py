@@ -0,0 +1,111 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, Sequence
+
+# Upper bucket bounds; latencies are in milliseconds, sizes in items or bytes
+_LATENCY_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_SIZE_BOUNDS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 100000, 1000000, 10000000)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float:
+        # The upper bound of the bucket the percentile falls into, capped by the largest value seen
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "buckets": {str(bound): count for bound, count in zip(self.bounds + ("inf",), self.buckets) if count},
+        }
+
+
+class _Metrics:
+    def __init__(self):
+        self.enabled = True
+        self.__lock = threading.Lock()
+        self.__started = time.time()
+        self.__counters: Dict[str, int] = {}
+        self.__histograms: Dict[str, _Histogram] = {}
+
+    def increment(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def observe_duration(self, name: str, seconds: float):
+        self.__observe(name, seconds * 1000, _LATENCY_BOUNDS)
+
+    def observe_size(self, name: str, size: int):
+        self.__observe(name, size, _SIZE_BOUNDS)
+
+    def __observe(self, name: str, value: float, bounds: Sequence[float]):
+        if not self.enabled:
+            return
+        # The stdout writer thread records into the same histograms as the event loop
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = _Histogram(bounds)
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.__lock:
+            return {
+                "started": self.__started,
+                "uptime": round(time.time() - self.__started, 3),
+                "counters": dict(sorted(self.__counters.items())),
+                "histograms": {name: histogram.snapshot() for name, histogram in sorted(self.__histograms.items())},
+            }
+
+    def reset(self):
+        with self.__lock:
+            self.__started = time.time()
+            self.__counters.clear()
+            self.__histograms.clear()
+
+
+def _write_snapshot(path: str, snapshot: Dict[str, Any]):
+    import json
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Readers polling the file never see it half written
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(snapshot, file, indent=2)
+    os.replace(temporary, path)
+
+
+_metrics = _Metrics()
@@ -1,38 +1,131 @@
 import asyncio
 import inspect
-from typing import List, Optional, Callable, Union, re
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Union, Dict, Any, Tuple
 
 from .JsonRpcConnection import _JsonRpcConnection
-from .datatypes import _InitRequestData, _OriginalQueryData, Metadata, NativeResult, Result
+from .datatypes import _InitRequestData, _OriginalQueryData, Metadata
 from .datatypes.SearchResults import SearchResults
 from .datatypes.Query import Query
 from .datatypes.RegexQuery import RegexQuery
 from .decorators.Search import SearchRestrictionsAndHandler, create_search_decorator, search_decorator_stub
+from .decorators.Dataset import _Dataset, dataset_decorator
+from .decorators.OnSettingsChanged import _OnSettingsChanged, on_settings_changed_decorator
 from .CancellationToken import CancellationToken
+from .Executors import _ExecutorPools, EXECUTION_THREAD, EXECUTION_PROCESS
+from .ResultMapper import _make_results
+from .ResultStore import _ResultStore
+from .Debouncer import _Debouncer, _TypingCadence
+from .ResultStream import _ResultStream, _is_streamed, _stream_results
+from .RpcLogging import _configure_logging, _logger
+from .HandlerInvoker import _HandlerInvoker
+from .SearchIndex import _SearchIndex, _SearchRoute
+from .Settings import _SettingsState
+from .StartupTimings import _startup_timings
+from .Metrics import _metrics, _write_snapshot
+from .Framing import FRAMING_AUTO
+from .Transport import _create_transport
+
+if TYPE_CHECKING:
+    from .FanOut import _FanOut
+    from .FlowApi import FlowApi
+    from .Profiler import _Profiler
+
+
+_UPDATE_RESULTS_METHOD = "UpdateResults"
+_DATASET_DIRECTORY = "cache"
+_DEBOUNCED = object()
+_PROFILE_DIRECTORY = "profiles"
+_METRICS_FILE = "metrics.json"
+# Reserved methods for tooling, never sent by Flow Launcher itself
+_METRICS_METHOD = "$/extended/metrics"
+_PROFILE_METHOD = "$/extended/profile"
 
 
 class Plugin:
     Search = search_decorator_stub
+    Dataset = staticmethod(dataset_decorator)
+    OnSettingsChanged = staticmethod(on_settings_changed_decorator)
+
+    log_level: int = logging.WARNING
+    log_file: Optional[str] = None
+    log_payload_limit: int = 2048
+    log_payload_sample_rate: int = 10
+    stream_interval: int = 50
+    thread_pool_size: Optional[int] = None
+    process_pool_size: Optional[int] = None
+    fast_startup: bool = True
+    result_store_size: int = 2048
+    result_store_max_bytes: int = 8 * 1024 * 1024
+    result_store_generations: int = 4
+    dataset_cache_directory: Optional[str] = None
+    host_request_timeout: Optional[int] = 30000
+    max_pending_host_requests: int = 256
+    batch_host_requests: bool = False
+    # Requests read but not started yet; past this new requests are answered with an error right away
+    max_queued_requests: int = 1024
+    # Requests started but not answered yet; past this the rest wait in the queue, where newer queries can still replace them
+    max_active_requests: int = 64
+    collect_metrics: bool = True
+    metrics_snapshot_interval: Optional[int] = None
+    metrics_snapshot_file: Optional[str] = None
+    profile_directory: Optional[str] = None
+    max_results: Optional[int] = None
+    settings_type: Optional[type] = None
+    fan_out: bool = False
+    fan_out_timeout: Optional[int] = None
+    # Flow Launcher talks over stdio; an address such as "tcp:127.0.0.1:5000" or "unix:/tmp/plugin.sock" connects there instead
+    transport_address: Optional[str] = None
+    framing: str = FRAMING_AUTO
 
     __metadata: Metadata
-    __settings: dict
+    __settings: _SettingsState
     __searches: List[SearchRestrictionsAndHandler] = []
+    # Filled by @Plugin.Search while a class body runs, then claimed by the class it belongs to
+    __pending_searches: List[SearchRestrictionsAndHandler] = []
     __cancellation_token: CancellationToken
-
-    # def __init_subclass__(cls, **kwargs):
-    #     super().__init_subclass__(**kwargs)
-    #     Plugin.__set_static_fields()
-    #     instance = cls()
-    #     asyncio.run(instance.__listen())
-
-    def __init__(self):
-        Plugin.__set_static_fields()
+    __search_index: Optional[_SearchIndex]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__declared_searches = Plugin.__pending_searches[:]
+        Plugin.__pending_searches.clear()
+        # Every subclass has its own registry, so several plugins can live in one process; base class handlers come first
+        cls.__searches = [search for klass in reversed(cls.__mro__) for search in vars(klass).get("_Plugin__declared_searches", ())]
+
+    def __init__(self, connection: Optional[_JsonRpcConnection] = None, executors: Optional[_ExecutorPools] = None):
+        # A plugin host hands every plugin the same pools, and configures logging and metrics once for all of them
+        self.__owns_executors = executors is None
+        if self.__owns_executors:
+            _configure_logging(self.log_level, self.log_file, self.log_payload_limit, self.log_payload_sample_rate)
+            _metrics.enabled = self.collect_metrics
         self.__cancellation_token = CancellationToken()
-        self.__connection = _JsonRpcConnection()
+        self.__settings = _SettingsState(self.settings_type)
+        self.__search_index = None
+        self.__typing_cadence = _TypingCadence()
+        self.__result_store = _ResultStore(self.result_store_size, self.result_store_max_bytes, self.result_store_generations)
+        self.__executors = executors if executors is not None else _ExecutorPools(self.thread_pool_size, self.process_pool_size)
+        # Profiling, the host API and fan-out import their modules on first use, none of them is needed to answer initialize
+        self.__profiler: Optional["_Profiler"] = None
+        self.__api: Optional["FlowApi"] = None
+        self.__connection = connection if connection is not None else _JsonRpcConnection(_create_transport(self.transport_address, self.framing))
+        self.__connection.request_timeout = self.host_request_timeout
+        self.__connection.max_pending_requests = self.max_pending_host_requests
+        self.__connection.batch_requests = self.batch_host_requests
+        self.__connection.max_queued_requests = self.max_queued_requests
+        self.__connection.max_active_requests = self.max_active_requests
         self.__connection.on_request("initialize", self.initialize)
         self.__connection.on_request("query", self.query)
+        # Keystrokes are timed as they arrive, queries coalesced away before they start still count towards the cadence
+        self.__connection.on_arrival("query", self.__typing_cadence.observe)
         self.__connection.on_request("context_menu", self.context_menu)
-        asyncio.run(self.__listen())
+        self.__connection.on_request(_METRICS_METHOD, self.__metrics_request)
+        self.__connection.on_request(_PROFILE_METHOD, self.profile)
+        # An injected connection belongs to a caller that runs serve() on its own event loop
+        if connection is None:
+            asyncio.run(self.serve())
 
     def initialize(self, data: _InitRequestData):
         self.__metadata = Metadata(
@@ -52,7 +145,14 @@ class Plugin:
             disabled=data["currentPluginMetadata"]["disabled"],
         )
 
-        Plugin.__searches.reverse()
+        if self.fast_startup:
+            # Answer initialize first and build the search index right after, while the host is still busy
+            asyncio.get_running_loop().call_soon(self.__warm_up)
+        else:
+            self.__warm_up()
+
+        if self.metrics_snapshot_interval:
+            asyncio.get_running_loop().call_later(self.metrics_snapshot_interval / 1000, self.__snapshot_metrics)
 
         return {}
 
@@ -60,63 +160,117 @@ class Plugin:
     def metadata(self):
         return self.__metadata
 
+    @property
+    def api(self) -> "FlowApi":
+        if self.__api is None:
+            from .FlowApi import FlowApi
+            self.__api = FlowApi(self.__connection, self.__metadata, lambda results: _make_results(results, self.__metadata.ico_path, self.__result_store, self.max_results))
+        return self.__api
+
+    @property
+    def settings(self) -> Any:
+        # None until the first query brings the settings along
+        return self.__settings.parsed
+
+    @property
+    def startup_timings(self) -> Dict[str, float]:
+        return _startup_timings.report()
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return _metrics.snapshot()
+
+    def profile(self, queries: int = 20, mode: Optional[str] = None, interval: float = 1) -> Dict[str, Any]:
+        # Records the next `queries` queries, the output lands in the profile directory once they are done
+        from .Profiler import _Profiler, PROFILE_CPROFILE
+
+        mode = mode if mode is not None else PROFILE_CPROFILE
+        if self.__profiler is None:
+            self.__profiler = _Profiler()
+        directory = self.profile_directory
+        if directory is None:
+            directory = os.path.join(self.__metadata.plugin_directory, _PROFILE_DIRECTORY)
+        self.__profiler.start(queries, mode, directory, interval)
+        return { "mode": mode, "queries": queries, "directory": directory }
+
     async def query(self, original_query: _OriginalQueryData, settings):
-        self.__settings = settings
+        if self.__settings.update(settings):
+            self.__settings_changed()
 
         if self.__cancellation_token is not None:
             self.__cancellation_token.cancel()
 
-        self.__cancellation_token = CancellationToken()
-
-        result: List[NativeResult] = []
-
-        for search in Plugin.__searches:
-            if search.restrictions is None or (
-                    search.restrictions.equal_to is None and
-                    search.restrictions.starts_with is None and
-                    search.restrictions.regex is None
-            ):
-                if not await self.__handle_debounce():
+        token = self.__cancellation_token = CancellationToken()
+        # Cancelling the token stops this query at its next await instead of letting it run to completion
+        unregister = token.register(asyncio.current_task().cancel)
+        metric = "search"
+        # Context menu ids of the results streamed so far, the final response reuses them too
+        stored_menus: Dict[int, Tuple[Any, int]] = {}
+
+        try:
+            started = time.perf_counter()
+            index = self.__get_search_index()
+            routes = index.route_all(original_query['search']) if self.fan_out else None
+            route = index.route(original_query['search']) if routes is None else routes[0] if len(routes) == 1 else None
+            _metrics.observe_duration("search.route", time.perf_counter() - started)
+
+            if routes is not None and len(routes) > 1:
+                metric = "search.fan_out"
+                # The merge has already applied every limit
+                max_results = None
+                data = await self.__fan_out(routes, original_query, token, stored_menus)
+            elif route is not None:
+                metric = f"search.{route.invoker.handler.__name__}"
+                max_results = self.__get_max_results(route)
+                data = await self.__bounded_search(route, original_query, token, metric, lambda items: self.__publish_results(original_query['rawQuery'], items, stored_menus, max_results))
+                if data is _DEBOUNCED:
                     return {}
-                result = self.__make_results(await self.__handle_search_call(search.handler, original_query))
-                break
-            elif search.restrictions.equal_to is not None:
-                if search.restrictions.case_sensitive and search.restrictions.equal_to == original_query['search']:
-                    if not await self.__handle_debounce(search.restrictions.debounce_delay):
-                        return {}
-                    result = self.__make_results(await self.__handle_search_call(search.handler, original_query, starting_index=len(search.restrictions.equal_to)))
-                    break
-
-                if not search.restrictions.case_sensitive and search.restrictions.equal_to.lower() == original_query['search'].lower():
-                    if not await self.__handle_debounce(search.restrictions.debounce_delay):
-                        return {}
-                    result = self.__make_results(await self.__handle_search_call(search.handler, original_query, starting_index=len(search.restrictions.equal_to)))
-                    break
-            elif search.restrictions.starts_with is not None:
-                if search.restrictions.case_sensitive and original_query['search'].startswith(search.restrictions.starts_with):
-                    if not await self.__handle_debounce(search.restrictions.debounce_delay):
-                        return {}
-                    result = self.__make_results(await self.__handle_search_call(search.handler, original_query, starting_index=len(search.restrictions.starts_with)))
-                    break
-
-                if not search.restrictions.case_sensitive and original_query['search'].lower().startswith(search.restrictions.starts_with.lower()):
-                    if not await self.__handle_debounce(search.restrictions.debounce_delay):
-                        return {}
-                    result = self.__make_results(await self.__handle_search_call(search.handler, original_query, starting_index=len(search.restrictions.starts_with)))
-                    break
-            elif search.restrictions.regex is not None:
-                matches = search.restrictions.regex.match(original_query['search'])
-                if matches:
-                    if not await self.__handle_debounce(search.restrictions.debounce_delay):
-                        return {}
-                    result = self.__make_results(await self.__handle_search_call(search.handler, original_query, regex_match=matches))
-                    break
-
-        # return { "result": result }
-        return { "error": { "code": -30603, "message": "Internal error" } }
-
-    def context_menu(self):
-        pass
+            else:
+                return { "result": [] }
+
+            token.raise_if_cancelled()
+            started = time.perf_counter()
+            self.__result_store.new_generation()
+            result = _make_results(data, self.__metadata.ico_path, self.__result_store, max_results, stored_menus)
+            _metrics.observe_duration(f"{metric}.convert", time.perf_counter() - started)
+            _metrics.observe_size(f"{metric}.results", len(result))
+
+            return { "result": result }
+        except asyncio.CancelledError:
+            # The host may cancel the request directly, so the handler has to hear about it as well
+            unregister()
+            token.cancel()
+            _metrics.increment(f"{metric}.cancelled")
+            raise
+        except Exception:
+            _metrics.increment(f"{metric}.errors")
+            raise
+        finally:
+            unregister()
+            if self.__profiler is not None and self.__profiler.is_active:
+                self.__finish_profiled_query()
+
+    async def context_menu(self, context_data: Any = None):
+        if isinstance(context_data, list):
+            # Results converted without a store carry their menu inline
+            return { "result": context_data }
+
+        entry = self.__result_store.get(context_data)
+        if entry is None:
+            return { "result": [] }
+
+        results = entry.results
+        if results is None:
+            menu = entry.menu
+            if callable(menu):
+                menu = menu()
+            if inspect.isawaitable(menu):
+                menu = await menu
+            results = _make_results(menu, self.__metadata.ico_path, self.__result_store)
+            # The entry may have been evicted while the menu was built, the host still gets this answer
+            self.__result_store.resolve(context_data, results)
+
+        return { "result": results }
 
     def __verify_context_menu_params(self, params: List) -> bool:
         if not isinstance(params, list):
@@ -133,69 +287,245 @@ class Plugin:
 
         return True
 
-    async def __listen(self):
-        await self.__connection.listen()
-
-    async def __handle_debounce(self, ms: Optional[int] = None) -> bool:
-        token = self.__cancellation_token
+    async def serve(self):
+        try:
+            await self.__connection.listen()
+        finally:
+            if self.__profiler is not None:
+                self.__profiler.stop()
+            if self.metrics_snapshot_interval:
+                self.__write_metrics_snapshot()
+            if self.__owns_executors:
+                self.__executors.shutdown()
+
+    def __get_search_index(self) -> _SearchIndex:
+        if self.__search_index is None:
+            # Handlers declared last take priority, so the index is built from the reversed registrations
+            self.__search_index = _SearchIndex(reversed(type(self).__searches), bind_to=self)
+        return self.__search_index
+
+    def __warm_up(self):
+        try:
+            self.__get_search_index().warm_up()
+        except Exception:
+            # Queries report the same error to the host, nothing more to do here
+            _logger.exception("Preparing the search index failed")
+
+        # Datasets load from their disk snapshots on a worker thread, ideally before the first query needs them
+        for dataset in self.__find_descriptors(_Dataset):
+            self.__executors.thread_pool.submit(self.__warm_up_dataset, dataset)
+
+    def __find_descriptors(self, kind: type) -> List[Any]:
+        # Subclasses override what they inherit under the same name
+        found = {name: value for cls in reversed(type(self).__mro__) for name, value in vars(cls).items() if isinstance(value, kind)}
+        return list(found.values())
+
+    def __warm_up_dataset(self, dataset: _Dataset):
+        try:
+            dataset.warm_up(self)
+        except Exception:
+            _logger.exception("Loading a dataset failed")
+
+    def __settings_changed(self):
+        _metrics.increment("settings.changes")
+        # Cached results were produced under the previous settings
+        if self.__search_index is not None:
+            self.__search_index.clear_caches()
+
+        for hook in self.__find_descriptors(_OnSettingsChanged):
+            if not hook.is_eager:
+                continue
+            try:
+                hook.refresh(self)
+            except Exception:
+                _logger.exception("Settings hook failed")
+
+    def __get_dataset_directory(self) -> str:
+        if self.dataset_cache_directory is not None:
+            return self.dataset_cache_directory
+        try:
+            return os.path.join(self.__metadata.plugin_directory, _DATASET_DIRECTORY)
+        except AttributeError:
+            raise RuntimeError("Datasets are only available after the plugin has been initialized") from None
+
+    def __metrics_request(self, reset: bool = False) -> Dict[str, Any]:
+        snapshot = _metrics.snapshot()
+        if reset:
+            _metrics.reset()
+        return snapshot
+
+    def __finish_profiled_query(self):
+        try:
+            path = self.__profiler.query_finished()
+        except Exception:
+            _logger.exception("Writing the profile failed")
+            return
+        if path is not None:
+            _logger.warning("Profile written to %s", path)
+
+    def __snapshot_metrics(self):
+        # Serialising and writing happen on a worker thread, the loop only schedules the next round
+        self.__executors.thread_pool.submit(self.__write_metrics_snapshot)
+        asyncio.get_running_loop().call_later(self.metrics_snapshot_interval / 1000, self.__snapshot_metrics)
+
+    def __write_metrics_snapshot(self):
+        path = self.metrics_snapshot_file
+        if path is None:
+            path = os.path.join(self.__metadata.plugin_directory, _METRICS_FILE)
+        try:
+            _write_snapshot(path, _metrics.snapshot())
+        except Exception:
+            _logger.warning("Could not write metrics to %s", path, exc_info=True)
+
+    def __get_max_results(self, route: _SearchRoute) -> Optional[int]:
+        restrictions = route.search.restrictions
+        return restrictions.max_results if restrictions is not None and restrictions.max_results is not None else self.max_results
+
+    async def __fan_out(self, routes: List[_SearchRoute], original_query: _OriginalQueryData, token: CancellationToken, stored_menus: Dict[int, Tuple[Any, int]]) -> List[Any]:
+        raw_query = original_query['rawQuery']
+        from .FanOut import _FanOut
+
+        fan_out = _FanOut([self.__get_max_results(route) for route in routes], self.max_results, lambda items: self.__publish_results(raw_query, items, stored_menus))
+        _metrics.observe_size("search.fan_out.handlers", len(routes))
+
+        tasks = [asyncio.ensure_future(self.__fan_out_route(route, original_query, token, fan_out, index)) for index, route in enumerate(routes)]
+        try:
+            await asyncio.wait(tasks, timeout=self.fan_out_timeout / 1000 if self.fan_out_timeout is not None else None)  # Convert milliseconds to seconds
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        sources = []
+        for index, task in enumerate(tasks):
+            if task.done() and not task.cancelled():
+                data = task.result()
+            else:
+                # Missed the deadline, whatever it streamed until now still counts
+                _metrics.increment("search.fan_out.deadline_missed")
+                data = fan_out.partial(index)
+            sources.append(data if data is not _DEBOUNCED else None)
+        return fan_out.merge(sources)
+
+    async def __fan_out_route(self, route: _SearchRoute, original_query: _OriginalQueryData, token: CancellationToken, fan_out: "_FanOut", index: int) -> Any:
+        metric = f"search.{route.invoker.handler.__name__}"
+        # Each handler gets its own token, so missing the deadline stops it without cancelling the query
+        handler_token = CancellationToken()
+        unregister = token.register(handler_token.cancel)
+        try:
+            # Sync handlers leave the loop here, the deadline cannot stop a handler that holds it
+            return await self.__bounded_search(route, original_query, handler_token, metric, lambda items: fan_out.update(index, items), offload=True)
+        except asyncio.CancelledError:
+            handler_token.cancel()
+            raise
+        except Exception:
+            # One failing source should not take the results of the others down with it
+            _logger.exception("Search handler %s failed", route.invoker.handler.__name__)
+            _metrics.increment(f"{metric}.errors")
+            return fan_out.partial(index)
+        finally:
+            unregister()
+
+    async def __bounded_search(self, route: _SearchRoute, original_query: _OriginalQueryData, token: CancellationToken, metric: str, publish: Callable[[List[Any]], None], offload: bool = False) -> Any:
+        restrictions = route.search.restrictions
+        timeout = restrictions.timeout if restrictions is not None else None
+        if timeout is None:
+            return await self.__search_route(route, original_query, token, metric, publish, offload)
+
+        partial = None
+
+        def publish_partial(items: List[Any]):
+            nonlocal partial
+            partial = items
+            publish(items)
+
+        handler_token = CancellationToken()
+        unregister = token.register(handler_token.cancel)
+        try:
+            return await asyncio.wait_for(self.__search_route(route, original_query, handler_token, metric, publish_partial, offload), timeout / 1000)  # Convert milliseconds to seconds
+        except asyncio.TimeoutError:
+            handler_token.cancel()
+            token.raise_if_cancelled()
+            _metrics.increment(f"{metric}.timeouts")
+            return partial
+        finally:
+            unregister()
+
+    async def __search_route(self, route: _SearchRoute, original_query: _OriginalQueryData, token: CancellationToken, metric: str, publish: Callable[[List[Any]], None], offload: bool = False) -> Any:
+        _metrics.increment(f"{metric}.calls")
+        restrictions = route.search.restrictions
+        query = route.invoker.make_query(original_query, starting_index=route.starting_index, regex_match=route.regex_match)
+        cache = route.cache
+        cache_key = (query.action_keyword, query.search)
+        data = cache.get(cache_key) if cache is not None else None
+        if cache is not None and not cache.is_miss(data):
+            _metrics.increment(f"{metric}.cache_hits")
+            return data
+
+        started = time.perf_counter()
+        if not await self.__handle_debounce(token, route.debouncer):
+            _metrics.increment(f"{metric}.debounced")
+            return _DEBOUNCED
+        if route.debouncer is not None:
+            _metrics.observe_duration(f"{metric}.debounce", time.perf_counter() - started)
+
+        candidates = cache.get_refinable(cache_key) if cache is not None and restrictions.refine_results else None
+        data = await self.__timed_search_call(route.invoker, query, token, candidates, route.debouncer, metric, publish, offload)
+        token.raise_if_cancelled()
+        if cache is not None:
+            cache.put(cache_key, data)
+        return data
+
+    async def __handle_debounce(self, token: CancellationToken, debouncer: Optional[_Debouncer] = None) -> bool:
         if token.is_cancelled: return False
-        if ms is None: return True
-        await asyncio.sleep(ms / 1000)  # Convert milliseconds to seconds
-        return not token.is_cancelled
-
-    @staticmethod
-    def __count_function_arguments(func: Callable) -> int:
-        return len([
-            param for param in inspect.signature(func).parameters.values()
-            if param.kind in (param.POSITIONAL_OR_KEYWORD, param.POSITIONAL_ONLY)
-        ])
-
-    @staticmethod
-    def __make_results(data) -> List[NativeResult]:
-        results: List[Result] = []
-        pass
-
-    @staticmethod
-    def __get_query(original_query: _OriginalQueryData, starting_index: Optional[int] = None, regex_match: Optional[re.Match] = None) -> Union[Query, RegexQuery]:
-        from_index = 0 if starting_index is None else starting_index
-        search = original_query['search'][from_index:].strip()
-        search_terms = [v for v in search.split(' ') if v != ""]
-        if regex_match is not None:
-            return RegexQuery(
-                raw=original_query['rawQuery'],
-                is_requery=original_query['isReQuery'],
-                action_keyword=original_query['actionKeyword'],
-                search=search,
-                search_terms=search_terms,
-                regex_matches=regex_match
-            )
+        if debouncer is None: return True
+        return await debouncer.wait(token, self.__typing_cadence)
+
+    async def __timed_search_call(self, invoker: _HandlerInvoker, query: Union[Query, RegexQuery], token: CancellationToken, candidates: Optional[SearchResults], debouncer: Optional[_Debouncer], metric: str, publish: Callable[[List[Any]], None], offload: bool = False) -> Optional[SearchResults]:
+        started = time.perf_counter()
+        completed = False
+        try:
+            result = await self.__handle_search_call(invoker, query, token, candidates, publish, offload)
+            completed = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            if completed:
+                _metrics.observe_duration(f"{metric}.handler", elapsed)
+            if debouncer is not None:
+                debouncer.record_latency(elapsed, completed)
+
+    async def __handle_search_call(self, invoker: _HandlerInvoker, query: Union[Query, RegexQuery], token: CancellationToken, candidates: Optional[SearchResults], publish: Callable[[List[Any]], None], offload: bool = False) -> Optional[SearchResults]:
+        # Handlers with `refine_results` take a third argument: the results cached for a shorter search to filter down
+        arguments = invoker.arguments(query, token, candidates)
+
+        if invoker.execution == EXECUTION_THREAD:
+            return await self.__executors.run_in_thread(invoker.handler, arguments)
+        if invoker.execution == EXECUTION_PROCESS:
+            return await self.__executors.run_in_process(invoker.handler, arguments, token, 1 if invoker.argument_count >= 2 else None)
+
+        if offload and not invoker.is_async and not invoker.is_async_generator:
+            # Still streamed below if it returned awaitables, only the call itself runs in the thread pool
+            result = await self.__executors.run_in_thread(invoker.handler, arguments)
         else:
-            return Query(
-                raw=original_query['rawQuery'],
-                is_requery=original_query['isReQuery'],
-                action_keyword=original_query['actionKeyword'],
-                search=search,
-                search_terms=search_terms
-            )
-
-
-    async def __handle_search_call(self, handler: Callable, original_query: _OriginalQueryData, starting_index: Optional[int] = None, regex_match: Optional[re.Match] = None) -> Optional[SearchResults]:
-        argument_count = self.__count_function_arguments(handler)
+            result = invoker.handler(*arguments)
 
-        result: Optional[SearchResults] = None
-
-        if argument_count == 0:
-            result = handler()
-        elif argument_count == 1:
-            result = handler(self.__get_query(original_query, starting_index=starting_index, regex_match=regex_match))
-        elif argument_count == 2:
-            result = handler(self.__get_query(original_query, starting_index=starting_index, regex_match=regex_match), self.__cancellation_token)
-
-        if inspect.iscoroutinefunction(handler):
+        if invoker.is_async:
             result = await result
 
+        if invoker.is_async_generator or _is_streamed(result):
+            # Async generators and lists of awaitables send what they have so far while the slower parts finish
+            stream = _ResultStream(publish, self.stream_interval)
+            result = await _stream_results(result, stream, token)
+
         return result
 
+    def __publish_results(self, raw_query: str, items: List, stored_menus: Dict[int, Tuple[Any, int]], max_results: Optional[int] = None):
+        self.__connection.send_notification(_UPDATE_RESULTS_METHOD, [raw_query, { "result": _make_results(items, self.__metadata.ico_path, self.__result_store, max_results, stored_menus) }])
+
     @classmethod
     def __set_static_fields(cls):
         cls.Search = create_search_decorator(cls)
+
+
+# `@Plugin.Search` runs while a subclass body executes, before any instance exists
+Plugin._Plugin__set_static_fields()
@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import hmac
+import importlib
+import json
+import logging
+import os
+import secrets
+import sys
+from typing import IO, Any, Dict, List, Optional, Tuple, Type
+
+from .Executors import _ExecutorPools
+from .JsonRpcConnection import _JsonRpcConnection
+from .Metrics import _metrics
+from .Plugin import Plugin
+from .PluginRelay import _connect_to_host, _default_state_file, _read_state
+from .RpcLogging import _configure_logging, _logger
+from .StreamTransport import _StreamTransport, _READ_LIMIT
+
+_DEFAULT_IDLE_TIMEOUT = 300000
+
+
+class PluginHost:
+    def __init__(
+            self,
+            plugins: Optional[Dict[str, Type[Plugin]]] = None,
+            state_file: Optional[str] = None,
+            idle_timeout: Optional[int] = _DEFAULT_IDLE_TIMEOUT,
+            thread_pool_size: Optional[int] = None,
+            process_pool_size: Optional[int] = None,
+            log_level: int = logging.WARNING,
+            log_file: Optional[str] = None,
+            collect_metrics: bool = True,
+    ):
+        # Plugins not listed here are imported from the module named in the relay's handshake
+        self.__plugin_types: Dict[str, Type[Plugin]] = dict(plugins) if plugins is not None else {}
+        self.__state_file = state_file if state_file is not None else _default_state_file()
+        self.__idle_timeout = idle_timeout
+        self.__executors = _ExecutorPools(thread_pool_size, process_pool_size)
+        # Hosted plugins share the process, so their log_* and collect_metrics attributes give way to these
+        self.__log_level = log_level
+        self.__log_file = log_file if log_file is not None else os.path.splitext(self.__state_file)[0] + ".log"
+        self.__collect_metrics = collect_metrics
+        self.__token = secrets.token_hex(16)
+        self.__plugins: Dict[str, Plugin] = {}
+        self.__connections = 0
+        self.__idle_timer: Optional[asyncio.TimerHandle] = None
+        self.__stopped: Optional[asyncio.Event] = None
+
+    @property
+    def plugins(self) -> Dict[str, Plugin]:
+        return dict(self.__plugins)
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    def stop(self):
+        if self.__stopped is not None:
+            self.__stopped.set()
+
+    async def serve(self):
+        self.__stopped = asyncio.Event()
+        _configure_logging(self.__log_level, self.__log_file)
+        _metrics.enabled = self.__collect_metrics
+        server, address = await self.__start_server()
+        _write_state(self.__state_file, {"address": address, "token": self.__token, "pid": os.getpid()})
+        self.__schedule_idle_stop()
+        try:
+            async with server:
+                await self.__stopped.wait()
+        finally:
+            # A host that lost a startup race must not remove what the winner published
+            state = _read_state(self.__state_file)
+            if state is not None and state.get("token") == self.__token:
+                _remove_file(self.__state_file)
+                if address.startswith("unix:"):
+                    _remove_file(address[len("unix:"):])
+            self.__executors.shutdown()
+
+    async def __start_server(self) -> Tuple[asyncio.AbstractServer, str]:
+        if sys.platform != "win32":
+            path = os.path.splitext(self.__state_file)[0] + ".sock"
+            # Only reached by the host holding the lock, so a socket left behind is stale
+            _remove_file(path)
+            umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self.__accept, path, limit=_READ_LIMIT)
+            finally:
+                os.umask(umask)
+            return server, f"unix:{path}"
+
+        server = await asyncio.start_server(self.__accept, "127.0.0.1", 0, limit=_READ_LIMIT)
+        return server, f"tcp:127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    async def __accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__connection_opened()
+        try:
+            line = await reader.readline()
+            if not line:
+                # Someone checking whether a host is running
+                writer.close()
+                return
+            try:
+                handshake = json.loads(line)
+                # Whoever can read the state file may connect, which on Windows is not implied by reaching the port
+                if not hmac.compare_digest(str(handshake.get("token", "")), self.__token):
+                    raise PermissionError("Invalid host token")
+                plugin_id = str(handshake["id"])
+                plugin = self.__resolve(plugin_id, handshake)(
+                    connection=_JsonRpcConnection(_StreamTransport(reader, writer)),
+                    executors=self.__executors,
+                )
+            except Exception as e:
+                _logger.warning("Refused a plugin connection", exc_info=True)
+                writer.write(json.dumps({"error": str(e)}).encode("utf-8") + b"\n")
+                writer.close()
+                return
+
+            writer.write(b'{"ok":true}\n')
+            self.__plugins[plugin_id] = plugin
+            try:
+                await plugin.serve()
+            finally:
+                if self.__plugins.get(plugin_id) is plugin:
+                    del self.__plugins[plugin_id]
+        finally:
+            self.__connection_closed()
+
+    def __resolve(self, plugin_id: str, handshake: Dict[str, Any]) -> Type[Plugin]:
+        plugin_type = self.__plugin_types.get(plugin_id)
+        if plugin_type is None:
+            plugin_type = _import_plugin(handshake["plugin"], handshake["directory"], handshake.get("path", []))
+            self.__plugin_types[plugin_id] = plugin_type
+        return plugin_type
+
+    def __connection_opened(self):
+        self.__connections += 1
+        if self.__idle_timer is not None:
+            self.__idle_timer.cancel()
+            self.__idle_timer = None
+
+    def __connection_closed(self):
+        self.__connections -= 1
+        if not self.__connections:
+            self.__schedule_idle_stop()
+
+    def __schedule_idle_stop(self):
+        # Flow Launcher never tells the host it is gone, so the host leaves once no plugin has been connected for a while
+        if self.__idle_timeout is not None:
+            self.__idle_timer = asyncio.get_running_loop().call_later(self.__idle_timeout / 1000, self.stop)  # Convert milliseconds to seconds
+
+
+def _import_plugin(spec: str, directory: str, paths: List[str]) -> Type[Plugin]:
+    module_name, _, class_name = spec.partition(":")
+    for path in paths:
+        if path not in sys.path:
+            sys.path.append(path)
+
+    module = importlib.import_module(module_name)
+    # Plugins share sys.modules here, so a top-level package name already taken by another plugin is a conflict
+    location = os.path.abspath(getattr(module, "__file__", None) or "")
+    if not location.startswith(os.path.join(os.path.abspath(directory), "")):
+        raise ImportError(f"{module_name} resolves to {location}, outside of {directory}")
+
+    plugin_type = getattr(module, class_name)
+    if not isinstance(plugin_type, type) or not issubclass(plugin_type, Plugin):
+        raise TypeError(f"{spec} is not a Plugin subclass")
+    return plugin_type
+
+
+def _write_state(path: str, state: Dict[str, Any]):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+    os.replace(temporary, path)
+
+
+def _lock_file(path: str) -> Optional[IO[bytes]]:
+    # Held for the lifetime of the host and released by the OS even if it crashes
+    file = open(path, "a+b")
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return None
+    return file
+
+
+def _remove_file(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve several Flow Launcher plugins from one Python process.")
+    parser.add_argument("--state-file", default=None, help="where the host publishes its address, shared with the relays")
+    parser.add_argument("--idle-timeout", type=int, default=_DEFAULT_IDLE_TIMEOUT, help="milliseconds without plugins before the host exits")
+    options = parser.parse_args(arguments)
+
+    state_file = options.state_file if options.state_file is not None else _default_state_file()
+    # Relays starting at the same moment may each launch a host, only the one holding the lock stays
+    lock = _lock_file(f"{state_file}.lock")
+    if lock is None:
+        return
+    try:
+        connection = _connect_to_host(state_file)
+        if connection is not None:
+            connection.close()
+            return
+        PluginHost(state_file=state_file, idle_timeout=options.idle_timeout).run()
+    finally:
+        lock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import importlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Kept free of the plugin runtime: a relay only imports it when it has to run the plugin itself
+
+_STATE_FILE_PREFIX = "extended-plugin-host"
+_HOST_START_TIMEOUT = 5.0
+_HOST_POLL_INTERVAL = 0.05
+_CHUNK_SIZE = 64 * 1024
+_MAX_REPLY_LENGTH = 64 * 1024
+_NO_HOST_VARIABLE = "EXTENDED_PLUGIN_NO_HOST"
+_CREATE_NEW_PROCESS_GROUP = 0x00000200
+_CREATE_NO_WINDOW = 0x08000000
+
+
+def run_relay(plugin: str, plugin_directory: Optional[str] = None, state_file: Optional[str] = None):
+    # `plugin` names the class as "module:Class"; Flow talks to this process, the plugin itself lives in the shared host
+    directory = os.path.abspath(plugin_directory if plugin_directory is not None else os.path.dirname(os.path.abspath(sys.argv[0])))
+    state_file = state_file if state_file is not None else _default_state_file()
+
+    connection = None
+    if not os.environ.get(_NO_HOST_VARIABLE):
+        handshake = {
+            "id": _read_plugin_id(directory) or plugin,
+            "plugin": plugin,
+            "directory": directory,
+            "path": [os.path.abspath(path) for path in sys.path if path],
+        }
+        connection = _connect_to_host(state_file, handshake)
+        if connection is None:
+            connection = _start_host(state_file, handshake)
+
+    if connection is None:
+        # No host, or it refused the plugin: run it here like any other plugin
+        _run_standalone(plugin)
+    else:
+        _relay(connection)
+
+
+def _connect_to_host(state_file: str, handshake: Optional[Dict[str, Any]] = None) -> Optional[socket.socket]:
+    state = _read_state(state_file)
+    if state is None:
+        return None
+
+    try:
+        kind, _, address = state["address"].partition(":")
+        if kind == "unix":
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(address)
+        else:
+            host, _, port = address.rpartition(":")
+            connection = socket.create_connection((host, int(port)))
+    except (OSError, KeyError, ValueError):
+        return None
+
+    if handshake is None:
+        return connection
+
+    try:
+        connection.sendall(json.dumps({**handshake, "token": state.get("token")}).encode("utf-8") + b"\n")
+        reply = json.loads(_read_reply(connection))
+    except (OSError, ValueError):
+        connection.close()
+        return None
+    if not reply.get("ok"):
+        connection.close()
+        return None
+    return connection
+
+
+def _read_reply(connection: socket.socket) -> bytes:
+    # Byte by byte, anything after the newline already belongs to the plugin
+    reply = bytearray()
+    while len(reply) < _MAX_REPLY_LENGTH:
+        byte = connection.recv(1)
+        if not byte or byte == b"\n":
+            break
+        reply += byte
+    return bytes(reply)
+
+
+def _start_host(state_file: str, handshake: Dict[str, Any]) -> Optional[socket.socket]:
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, (package_root, environment.get("PYTHONPATH"))))
+    if sys.platform == "win32":
+        options = {"creationflags": _CREATE_NEW_PROCESS_GROUP | _CREATE_NO_WINDOW}
+    else:
+        # The host outlives the plugin process that happened to start it
+        options = {"start_new_session": True}
+
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "extended_plugin.PluginHost", "--state-file", state_file],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=package_root,
+            env=environment,
+            close_fds=True,
+            **options,
+        )
+    except OSError:
+        return None
+
+    deadline = time.monotonic() + _HOST_START_TIMEOUT
+    while time.monotonic() < deadline:
+        connection = _connect_to_host(state_file, handshake)
+        if connection is not None:
+            return connection
+        time.sleep(_HOST_POLL_INTERVAL)
+    return None
+
+
+def _relay(connection: socket.socket):
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+
+    def forward_requests():
+        read = getattr(stdin, "read1", stdin.read)
+        try:
+            while True:
+                chunk = read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                connection.sendall(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            # The host sees the end of input and shuts this plugin down, which closes the connection in turn
+            try:
+                connection.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    threading.Thread(target=forward_requests, name="relay-stdin", daemon=True).start()
+    try:
+        while True:
+            chunk = connection.recv(_CHUNK_SIZE)
+            if not chunk:
+                break
+            stdout.write(chunk)
+            stdout.flush()
+    except (OSError, ValueError):
+        pass
+    finally:
+        connection.close()
+
+
+def _run_standalone(plugin: str):
+    module_name, _, class_name = plugin.partition(":")
+    plugin_type = getattr(importlib.import_module(module_name), class_name)
+    plugin_type()
+
+
+def _read_plugin_id(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, "plugin.json"), "r", encoding="utf-8") as file:
+            return json.load(file).get("ID")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _default_state_file() -> str:
+    # The temporary directory is shared between users on POSIX systems
+    user = str(os.getuid()) if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"{_STATE_FILE_PREFIX}-{user}.json")
+
+
+def _read_state(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
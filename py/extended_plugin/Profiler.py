@@ -0,0 +1,110 @@
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Counter, Optional
+
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLING = "sampling"
+_DEFAULT_SAMPLING_INTERVAL = 1
+_MAX_STACK_DEPTH = 128
+_SUMMARY_LINES = 60
+
+
+class _SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float):
+        self.__thread_id = thread_id
+        self.__interval = interval / 1000  # Convert milliseconds to seconds
+        self.__stacks: Counter[str] = collections.Counter()
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__sample, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__thread.join()
+
+    def write(self, path: str):
+        # Collapsed stacks, the input format of flamegraph.pl, speedscope and friends
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.__stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def __sample(self):
+        while not self.__stopped.wait(self.__interval):
+            frame = sys._current_frames().get(self.__thread_id)
+            names = []
+            while frame is not None and len(names) < _MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.__stacks[";".join(reversed(names))] += 1
+
+
+class _Profiler:
+    def __init__(self):
+        self.__profiler = None
+        self.__mode: Optional[str] = None
+        self.__directory: Optional[str] = None
+        self.__remaining = 0
+
+    @property
+    def is_active(self) -> bool:
+        return self.__profiler is not None
+
+    def start(self, queries: int, mode: str, directory: str, interval: float = _DEFAULT_SAMPLING_INTERVAL):
+        if queries < 1:
+            raise ValueError("At least one query has to be profiled")
+        if self.is_active:
+            raise RuntimeError("A profile is already being recorded")
+
+        # Both profilers follow the thread that calls start, which is the event loop running the handlers
+        if mode == PROFILE_CPROFILE:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif mode == PROFILE_SAMPLING:
+            profiler = _SamplingProfiler(threading.get_ident(), interval)
+            profiler.start()
+        else:
+            raise ValueError(f"Unknown profiler {mode!r}, expected {PROFILE_CPROFILE!r} or {PROFILE_SAMPLING!r}")
+
+        self.__profiler = profiler
+        self.__mode = mode
+        self.__directory = directory
+        self.__remaining = queries
+
+    def query_finished(self) -> Optional[str]:
+        if not self.is_active:
+            return None
+        self.__remaining -= 1
+        return self.stop() if self.__remaining <= 0 else None
+
+    def stop(self) -> Optional[str]:
+        profiler, self.__profiler = self.__profiler, None
+        if profiler is None:
+            return None
+
+        if self.__mode == PROFILE_CPROFILE:
+            profiler.disable()
+        else:
+            profiler.stop()
+
+        os.makedirs(self.__directory, exist_ok=True)
+        now = time.time()
+        name = os.path.join(self.__directory, time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}")
+        if self.__mode == PROFILE_CPROFILE:
+            import pstats
+            path = name + ".prof"
+            profiler.dump_stats(path)
+            # A readable summary next to the binary dump, for when snakeviz is not at hand
+            with open(name + ".txt", "w", encoding="utf-8") as file:
+                pstats.Stats(profiler, stream=file).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_SUMMARY_LINES)
+        else:
+            path = name + ".folded"
+            profiler.write(path)
+        return path
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .Metrics import _metrics
+
+# Handled before anything else that is waiting, a context menu should not queue behind searches
+_PRIORITY_METHODS = frozenset(("initialize", "context_menu"))
+# Only the newest of these is worth running, the host has already moved on from the others
+_LATEST_ONLY_METHOD = "query"
+
+_Entry = Tuple[Dict[str, Any], float]
+
+
+class _QueueFullError(OverflowError):
+    pass
+
+
+class _RequestScheduler:
+    def __init__(self, max_size: int):
+        self.__max_size = max(1, max_size)
+        self.__priority: Deque[_Entry] = deque()
+        self.__normal: Deque[_Entry] = deque()
+        self.__latest: Optional[_Entry] = None
+        self.__not_empty = asyncio.Event()
+        self.__closed = False
+
+    def __len__(self) -> int:
+        return len(self.__priority) + len(self.__normal) + (self.__latest is not None)
+
+    def put(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Returns the request this one replaces, which the caller still has to answer
+        method = request.get('method')
+        if method == _LATEST_ONLY_METHOD and self.__latest is not None:
+            superseded = self.__latest[0]
+            self.__latest = (request, time.perf_counter())
+            _metrics.increment("scheduler.coalesced")
+            return superseded
+
+        if len(self) >= self.__max_size:
+            # Reading has to go on so responses and cancellations still arrive, what does not fit is turned away instead
+            _metrics.increment("scheduler.rejected")
+            raise _QueueFullError(f"More than {self.__max_size} requests are waiting")
+
+        entry = (request, time.perf_counter())
+        if method == _LATEST_ONLY_METHOD:
+            self.__latest = entry
+        elif method in _PRIORITY_METHODS:
+            self.__priority.append(entry)
+        else:
+            self.__normal.append(entry)
+        _metrics.observe_size("scheduler.depth", len(self))
+        self.__not_empty.set()
+        return None
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        # None once the scheduler is closed and everything queued before has been handed out
+        while not len(self):
+            if self.__closed:
+                return None
+            self.__not_empty.clear()
+            await self.__not_empty.wait()
+
+        if self.__priority:
+            request, queued_at = self.__priority.popleft()
+        elif self.__normal:
+            request, queued_at = self.__normal.popleft()
+        else:
+            (request, queued_at), self.__latest = self.__latest, None
+        _metrics.observe_duration("scheduler.wait", time.perf_counter() - queued_at)
+        return request
+
+    def remove(self, request_id: Any) -> Optional[Dict[str, Any]]:
+        # Requests cancelled while they are still queued never start
+        if request_id is None:
+            return None
+        if self.__latest is not None and self.__latest[0].get('id') == request_id:
+            request, self.__latest = self.__latest[0], None
+            return request
+        for queue in (self.__priority, self.__normal):
+            for entry in queue:
+                if entry[0].get('id') == request_id:
+                    queue.remove(entry)
+                    return entry[0]
+        return None
+
+    def close(self):
+        self.__closed = True
+        self.__not_empty.set()
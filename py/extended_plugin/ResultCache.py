@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+_DEFAULT_CACHE_SIZE = 128
+_MISS = object()
+
+CacheKey = Tuple[str, str]
+
+
+class _ResultCache:
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[int] = None):
+        self.__max_size = max_size if max_size is not None else _DEFAULT_CACHE_SIZE
+        self.__ttl = ttl / 1000 if ttl is not None else None  # Convert milliseconds to seconds
+        self.__entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: CacheKey) -> Any:
+        entry = self.__entries.get(key)
+        if entry is None:
+            return _MISS
+
+        if self.__is_expired(entry):
+            del self.__entries[key]
+            return _MISS
+
+        self.__entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: CacheKey, value: Any):
+        self.__entries[key] = (time.monotonic(), value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+
+    def get_refinable(self, key: CacheKey) -> Optional[Any]:
+        # The longest cached search that the new search extends holds the smallest candidate set
+        action_keyword, search = key
+        for length in range(len(search) - 1, 0, -1):
+            value = self.get((action_keyword, search[:length]))
+            if value is not _MISS:
+                return value
+        return None
+
+    def __is_expired(self, entry: Tuple[float, Any]) -> bool:
+        return self.__ttl is not None and time.monotonic() - entry[0] > self.__ttl
+
+    @staticmethod
+    def is_miss(value: Any) -> bool:
+        return value is _MISS
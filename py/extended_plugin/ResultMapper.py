@@ -0,0 +1,122 @@
+import heapq
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .datatypes.ActionData import ActionData
+from .datatypes.Result import Result
+from .datatypes.ResultPreview import ResultPreview
+from .datatypes.SearchResults import SearchResults
+from .ResultStore import _ResultStore
+
+# Result attribute -> NativeResult key, resolved once so each conversion is a single attrgetter call
+_RESULT_FIELDS = (
+    ("title", "title"),
+    ("subtitle", "subtitle"),
+    ("text_to_copy_on_ctrl_c", "copyText"),
+    ("autocomplete_text", "autoCompleteText"),
+    ("is_icon_round", "roundedIcon"),
+    ("score", "score"),
+    ("title_highlight_data", "titleHighlightData"),
+    ("title_tooltip", "titleTooltip"),
+    ("subtitle_tooltip", "subtitleTooltip"),
+    ("progress", "progressBar"),
+    ("progress_bar_color", "progressBarColor"),
+)
+_PREVIEW_FIELDS = (
+    ("preview_image_path", "previewImagePath"),
+    ("is_media", "isMedia"),
+    ("description", "description"),
+    ("file_path", "filePath"),
+)
+
+_get_result_values = attrgetter(*(name for name, _ in _RESULT_FIELDS))
+_RESULT_KEYS = tuple(key for _, key in _RESULT_FIELDS)
+_get_preview_values = attrgetter(*(name for name, _ in _PREVIEW_FIELDS))
+_PREVIEW_KEYS = tuple(key for _, key in _PREVIEW_FIELDS)
+
+
+def _make_results(data: Optional[SearchResults], default_icon: Optional[str] = None, store: Optional[_ResultStore] = None, max_results: Optional[int] = None, stored_menus: Optional[Dict[int, Tuple[Any, int]]] = None) -> List[Dict[str, Any]]:
+    if data is None:
+        return []
+    if not isinstance(data, (list, tuple)):
+        data = [data]
+    data = _top_results(data, max_results)
+    return [_make_result(value, default_icon, store, stored_menus) for value in data if value is not None]
+
+
+def _top_results(data: Optional[SearchResults], max_results: Optional[int]) -> Optional[SearchResults]:
+    if max_results is None or not isinstance(data, (list, tuple)) or len(data) <= max_results:
+        return data
+    # Results the host would never show are dropped before they are converted and encoded
+    return heapq.nlargest(max_results, (value for value in data if value is not None), key=_get_score)
+
+
+def _get_score(value: Any) -> int:
+    if isinstance(value, Result):
+        return value.score or 0
+    if isinstance(value, dict):
+        return _get_field(value, "score") or 0
+    return 0
+
+
+def _get_field(value: Dict[str, Any], key: str) -> Any:
+    # The host reads result dicts case-insensitively, "Score" and "score" are the same field
+    if key in value:
+        return value[key]
+    key = key.lower()
+    for name, field in value.items():
+        if isinstance(name, str) and name.lower() == key:
+            return field
+    return None
+
+
+def _make_result(value: Any, default_icon: Optional[str] = None, store: Optional[_ResultStore] = None, stored_menus: Optional[Dict[int, Tuple[Any, int]]] = None) -> Dict[str, Any]:
+    if isinstance(value, Result):
+        return _convert_result(value, default_icon, store, stored_menus)
+    if isinstance(value, dict):
+        # Already in Flow Launcher's wire format
+        return value
+    return _convert_result(Result(title=str(value)), default_icon, store)
+
+
+def _convert_result(result: Result, default_icon: Optional[str], store: Optional[_ResultStore] = None, stored_menus: Optional[Dict[int, Tuple[Any, int]]] = None) -> Dict[str, Any]:
+    native = {key: value for key, value in zip(_RESULT_KEYS, _get_result_values(result)) if value is not None}
+
+    icon_path = result.icon_path if result.icon_path is not None else default_icon
+    if icon_path is not None:
+        native["icoPath"] = icon_path
+
+    action = result.action
+    if isinstance(action, ActionData):
+        native["jsonRPCAction"] = action.to_dict()
+    elif isinstance(action, dict):
+        native["jsonRPCAction"] = action
+
+    if result.preview is not None:
+        native["preview"] = _convert_preview(result.preview)
+
+    if result.context_menu is not None:
+        # With a store, the host only gets an id back and the menu is built once it is opened
+        if store is not None:
+            native["contextData"] = _store_menu(result.context_menu, store, stored_menus)
+        else:
+            native["contextData"] = _make_results(result.context_menu, default_icon)
+
+    return native
+
+
+def _store_menu(menu: Any, store: _ResultStore, stored_menus: Optional[Dict[int, Tuple[Any, int]]]) -> int:
+    if stored_menus is None:
+        return store.put(menu)
+    # Streamed results are converted again on every flush, their menus are only stored the first time.
+    # The menu is kept alongside its id, so id(menu) cannot be reused by another object meanwhile
+    known = stored_menus.get(id(menu))
+    if known is not None and store.renew(known[1]):
+        return known[1]
+    result_id = store.put(menu)
+    stored_menus[id(menu)] = (menu, result_id)
+    return result_id
+
+
+def _convert_preview(preview: ResultPreview) -> Dict[str, Any]:
+    return {key: value for key, value in zip(_PREVIEW_KEYS, _get_preview_values(preview)) if value is not None}
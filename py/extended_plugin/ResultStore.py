@@ -0,0 +1,97 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+_DEFAULT_MAX_ENTRIES = 2048
+_DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+_DEFAULT_GENERATIONS = 4
+
+
+class _StoredResult:
+    __slots__ = ("generation", "menu", "results", "size")
+
+    def __init__(self, generation: int, menu: Any, size: int):
+        self.generation = generation
+        self.menu = menu
+        self.results: Optional[List[Dict[str, Any]]] = None
+        self.size = size
+
+
+class _ResultStore:
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, generations: Optional[int] = None):
+        self.__max_entries = max_entries if max_entries is not None else _DEFAULT_MAX_ENTRIES
+        self.__max_bytes = max_bytes if max_bytes is not None else _DEFAULT_MAX_BYTES
+        self.__generations = max(1, generations if generations is not None else _DEFAULT_GENERATIONS)
+        self.__entries: "OrderedDict[int, _StoredResult]" = OrderedDict()
+        self.__next_id = 1
+        self.__generation = 0
+        self.__bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def new_generation(self):
+        # Every query response starts a generation, menus from queries the user has typed past get dropped
+        self.__generation += 1
+        self.__trim()
+
+    def put(self, menu: Any) -> int:
+        result_id = self.__next_id
+        self.__next_id += 1
+
+        entry = _StoredResult(self.__generation, menu, _estimate_size(menu))
+        self.__entries[result_id] = entry
+        self.__bytes += entry.size
+        self.__trim()
+        return result_id
+
+    def renew(self, result_id: int) -> bool:
+        entry = self.__entries.get(result_id)
+        if entry is None:
+            return False
+        # Sent again with a newer response, so it is kept as long as the entries stored for that one
+        entry.generation = self.__generation
+        self.__entries.move_to_end(result_id)
+        return True
+
+    def get(self, result_id: Any) -> Optional[_StoredResult]:
+        # Entries stay in insertion order, so trimming from the front always drops the oldest generation first
+        return self.__entries.get(result_id) if isinstance(result_id, int) else None
+
+    def resolve(self, result_id: int, results: List[Dict[str, Any]]):
+        entry = self.__entries.get(result_id)
+        if entry is None:
+            return
+
+        # The menu is only needed until it has been converted once
+        entry.menu = None
+        entry.results = results
+        self.__bytes -= entry.size
+        entry.size = _estimate_size(results)
+        self.__bytes += entry.size
+        self.__trim()
+
+    def __trim(self):
+        oldest_generation = self.__generation - self.__generations + 1
+        entries = self.__entries
+        while entries:
+            result_id, entry = next(iter(entries.items()))
+            if entry.generation >= oldest_generation and (
+                    # The limits never evict the latest response, or its top results would lose their menus first
+                    entry.generation == self.__generation or
+                    (len(entries) <= self.__max_entries and self.__bytes <= self.__max_bytes)
+            ):
+                break
+            del entries[result_id]
+            self.__bytes -= entry.size
+
+
+def _estimate_size(menu: Any) -> int:
+    # Shallow sizes only: good enough to keep the store bounded without walking every nested object
+    size = sys.getsizeof(menu)
+    if isinstance(menu, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in menu)
+        for item in menu:
+            if isinstance(item, dict):
+                size += sum(sys.getsizeof(value) for value in item.values())
+    return size
@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, List, Optional
+
+from .CancellationToken import CancellationToken
+from .RpcLogging import _logger
+from .datatypes.SearchResults import SearchResults
+
+
+class _ResultStream:
+    def __init__(self, publish: Callable[[List[Any]], None], interval: int):
+        self.__publish = publish
+        self.__interval = interval / 1000  # Convert milliseconds to seconds
+        self.__items: List[Any] = []
+        self.__published_count = 0
+        self.__last_publish = 0.0
+        self.__timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def items(self) -> List[Any]:
+        return self.__items
+
+    def add(self, data: Optional[SearchResults]):
+        if data is None:
+            return
+        if isinstance(data, (list, tuple)):
+            self.__items.extend(value for value in data if value is not None)
+        else:
+            self.__items.append(data)
+        self.__schedule()
+
+    def close(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __schedule(self):
+        if self.__timer is not None:
+            return
+
+        # Batches are sent at most once per interval, so quick sources are grouped into one update
+        delay = self.__last_publish + self.__interval - time.monotonic()
+        if delay <= 0:
+            self.__flush()
+        else:
+            self.__timer = asyncio.get_running_loop().call_later(delay, self.__flush)
+
+    def __flush(self):
+        self.__timer = None
+        if len(self.__items) == self.__published_count:
+            return
+        self.__published_count = len(self.__items)
+        self.__last_publish = time.monotonic()
+        self.__publish(self.__items)
+
+
+async def _stream_results(results: Any, stream: _ResultStream, token: CancellationToken) -> List[Any]:
+    try:
+        if inspect.isasyncgen(results):
+            try:
+                async for data in results:
+                    token.raise_if_cancelled()
+                    stream.add(data)
+            finally:
+                await results.aclose()
+        else:
+            pending = []
+            for value in results:
+                if inspect.isawaitable(value):
+                    pending.append(value)
+                else:
+                    stream.add(value)
+
+            tasks = [asyncio.ensure_future(awaitable) for awaitable in pending]
+            try:
+                for completed in asyncio.as_completed(tasks):
+                    try:
+                        stream.add(await completed)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        # One failing source should not take the results of the others down with it
+                        _logger.exception("A search result source failed")
+                    token.raise_if_cancelled()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return stream.items
+    finally:
+        stream.close()
+
+
+def _is_streamed(results: Any) -> bool:
+    if inspect.isasyncgen(results):
+        return True
+    return isinstance(results, list) and any(inspect.isawaitable(value) for value in results)
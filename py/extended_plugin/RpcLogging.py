@@ -0,0 +1,110 @@
+import atexit
+import logging
+import os
+import sys
+from typing import TYPE_CHECKING, Optional, Union
+
+if TYPE_CHECKING:
+    import logging.handlers
+
+_LOGGER_NAME = "extended_plugin"
+_DEFAULT_LOG_PATH = os.path.join("logs", "extended_plugin.log")
+_LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_logger = logging.getLogger(_LOGGER_NAME)
+_logger.addHandler(logging.NullHandler())
+_logger.propagate = False
+
+
+class _PayloadLogSettings:
+    limit = 2048
+    sample_rate = 10
+    large_payloads_seen = 0
+
+
+class _Payload:
+    __slots__ = ("__data", "__limit")
+
+    # Decoding and truncation only happen if a handler actually formats the record
+    def __init__(self, data: Union[bytes, str], limit: int):
+        self.__data = data
+        self.__limit = limit
+
+    def __str__(self):
+        data = self.__data
+        if len(data) <= self.__limit:
+            return data.decode("utf-8", "replace") if isinstance(data, bytes) else data
+
+        head = data[:self.__limit]
+        head = head.decode("utf-8", "replace") if isinstance(head, bytes) else head
+        return f"{head}... ({len(data)} bytes)"
+
+
+_listener: Optional["logging.handlers.QueueListener"] = None
+
+
+def _configure_logging(
+        level: int = logging.WARNING,
+        path: Optional[str] = None,
+        payload_limit: int = 2048,
+        payload_sample_rate: int = 10,
+        directory: Optional[str] = None,
+):
+    # Imported here rather than with the package, logging.handlers brings pickle and socket along
+    import logging.handlers
+    import queue
+
+    global _listener
+
+    _stop_listener()
+
+    if path is None:
+        if directory is None:
+            # A plugin started by Flow Launcher runs the main.py in its own directory
+            directory = os.path.dirname(os.path.abspath(sys.argv[0])) if sys.argv and sys.argv[0] else os.getcwd()
+        path = os.path.join(directory, _DEFAULT_LOG_PATH)
+
+    _PayloadLogSettings.limit = payload_limit
+    _PayloadLogSettings.sample_rate = max(1, payload_sample_rate)
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+    except OSError:
+        _logger.addHandler(logging.NullHandler())
+        return
+
+    file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+
+    # File I/O happens on the listener's thread, the event loop only enqueues records
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _logger.addHandler(logging.handlers.QueueHandler(records))
+    _logger.setLevel(level)
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    _listener.start()
+
+
+def _log_payload(direction: str, data: Union[bytes, str]):
+    if not _logger.isEnabledFor(logging.DEBUG):
+        return
+
+    if len(data) > _PayloadLogSettings.limit:
+        # Only every n-th oversized payload is logged, starting with the first
+        _PayloadLogSettings.large_payloads_seen += 1
+        if (_PayloadLogSettings.large_payloads_seen - 1) % _PayloadLogSettings.sample_rate:
+            return
+
+    _logger.debug("%s %s", direction, _Payload(data, _PayloadLogSettings.limit))
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
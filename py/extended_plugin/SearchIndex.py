@@ -0,0 +1,288 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Iterable, Tuple
+
+from .decorators.Search import SearchRestrictions, SearchRestrictionsAndHandler
+from .Executors import EXECUTION_PROCESS
+from .HandlerInvoker import _HandlerInvoker
+from .ResultCache import _ResultCache
+from .Debouncer import _Debouncer
+
+_REGEX_GROUP_PREFIX = "_search_index_"
+_SCOPED_REGEX_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+    (re.ASCII, "a"),
+)
+_UNSUPPORTED_REGEX_FLAGS = re.LOCALE | re.DEBUG
+# Numbered and named back-references change meaning once the pattern is wrapped in a combined alternation
+_BACKREFERENCE = r"\\[1-9]|\\g<|\(\?P=|\(\?\("
+
+
+@dataclass(frozen=True)
+class _SearchRoute:
+    search: SearchRestrictionsAndHandler
+    invoker: _HandlerInvoker
+    starting_index: Optional[int] = None
+    regex_match: Optional[re.Match] = None
+    cache: Optional[_ResultCache] = None
+    debouncer: Optional[_Debouncer] = None
+
+
+class _IndexEntry:
+    __slots__ = ("priority", "search", "invoker", "min_length", "max_length", "cache", "debouncer")
+
+    def __init__(self, priority: int, search: SearchRestrictionsAndHandler, invoker: _HandlerInvoker):
+        self.priority = priority
+        self.search = search
+        self.invoker = invoker
+        restrictions = search.restrictions
+        self.min_length = restrictions.min_length if restrictions is not None else None
+        self.max_length = restrictions.max_length if restrictions is not None else None
+        self.cache = _ResultCache(restrictions.cache_size, restrictions.cache_ttl) if restrictions is not None and restrictions.is_cached else None
+        self.debouncer = _Debouncer(restrictions.debounce_delay, bool(restrictions.adaptive_debounce)) if restrictions is not None and restrictions.is_debounced else None
+
+    def fits_length(self, search: str, starting_index: Optional[int] = None) -> bool:
+        if self.min_length is None and self.max_length is None:
+            return True
+
+        length = len(search[starting_index or 0:].strip())
+        if self.min_length is not None and length < self.min_length:
+            return False
+        if self.max_length is not None and length > self.max_length:
+            return False
+        return True
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[str, _TrieNode] = {}
+        self.entries: List[_IndexEntry] = []
+
+
+class _PrefixTrie:
+    def __init__(self):
+        self.__root = _TrieNode()
+        self.__empty = True
+
+    def add(self, prefix: str, entry: _IndexEntry):
+        node = self.__root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        node.entries.append(entry)
+        self.__empty = False
+
+    def collect(self, search: str, candidates: List[Tuple[_IndexEntry, Optional[int]]]):
+        if self.__empty:
+            return
+
+        node = self.__root
+        for entry in node.entries:
+            candidates.append((entry, 0))
+
+        for depth, char in enumerate(search, start=1):
+            node = node.children.get(char)
+            if node is None:
+                return
+            for entry in node.entries:
+                candidates.append((entry, depth))
+
+
+class _SearchIndex:
+    def __init__(self, searches: Iterable[SearchRestrictionsAndHandler], bind_to: Optional[object] = None):
+        self.__catch_all: List[_IndexEntry] = []
+        self.__equal_exact: Dict[str, List[_IndexEntry]] = {}
+        self.__equal_folded: Dict[str, List[_IndexEntry]] = {}
+        self.__prefix_exact = _PrefixTrie()
+        self.__prefix_folded = _PrefixTrie()
+        self.__regex_entries: List[_IndexEntry] = []
+        self.__regex_patterns: Dict[int, re.Pattern[str]] = {}
+        self.__combined_regex: Optional[re.Pattern[str]] = None
+        self.__combined_groups: Dict[int, _IndexEntry] = {}
+        self.__first_standalone_regex_priority: Optional[int] = None
+        self.__regexes_compiled = False
+        self.__caches: List[_ResultCache] = []
+
+        for priority, search in enumerate(searches):
+            invoker = search.invoker.bind(bind_to) if bind_to is not None and not self.__runs_in_process(search) else search.invoker
+            self.__add(_IndexEntry(priority, search, invoker))
+
+    def warm_up(self):
+        if not self.__regexes_compiled:
+            self.__compile_regexes()
+
+    def clear_caches(self):
+        for cache in self.__caches:
+            cache.clear()
+
+    @staticmethod
+    def __runs_in_process(search: SearchRestrictionsAndHandler) -> bool:
+        return search.restrictions is not None and search.restrictions.execution == EXECUTION_PROCESS
+
+    def __add(self, entry: _IndexEntry):
+        restrictions: Optional[SearchRestrictions] = entry.search.restrictions
+        if entry.cache is not None:
+            self.__caches.append(entry.cache)
+
+        if restrictions is None or (
+                restrictions.equal_to is None and
+                restrictions.starts_with is None and
+                restrictions.regex is None
+        ):
+            self.__catch_all.append(entry)
+        elif restrictions.equal_to is not None:
+            if restrictions.case_sensitive:
+                self.__equal_exact.setdefault(restrictions.equal_to, []).append(entry)
+            else:
+                self.__equal_folded.setdefault(restrictions.equal_to.lower(), []).append(entry)
+        elif restrictions.starts_with is not None:
+            if restrictions.case_sensitive:
+                self.__prefix_exact.add(restrictions.starts_with, entry)
+            else:
+                self.__prefix_folded.add(restrictions.starts_with.lower(), entry)
+        else:
+            self.__regex_entries.append(entry)
+
+    def __compile_regexes(self):
+        # Patterns were compiled by @Plugin.Search, only the combined alternation is built here
+        patterns = {entry.priority: entry.search.restrictions.compiled_regex for entry in self.__regex_entries}
+        self.__regex_patterns.update(patterns)
+        self.__regexes_compiled = True
+        alternatives: List[str] = []
+        group_names: set = set()
+
+        for entry in self.__regex_entries:
+            pattern = self.__regex_patterns[entry.priority]
+            if not self.__can_combine(pattern, group_names):
+                if self.__first_standalone_regex_priority is None:
+                    self.__first_standalone_regex_priority = entry.priority
+                continue
+
+            group_names.update(pattern.groupindex)
+            flags = "".join(letter for flag, letter in _SCOPED_REGEX_FLAGS if pattern.flags & flag)
+            source = pattern.pattern + "\n" if pattern.flags & re.VERBOSE else pattern.pattern
+            body = f"(?{flags}:{source})" if flags else f"(?:{source})"
+            alternatives.append(f"(?P<{_REGEX_GROUP_PREFIX}{entry.priority}>{body})")
+
+        if not alternatives:
+            return
+
+        try:
+            combined = re.compile("|".join(alternatives))
+        except re.error:
+            # Fall back to matching every regex on its own rather than failing the whole plugin
+            self.__first_standalone_regex_priority = self.__regex_entries[0].priority
+            return
+
+        self.__combined_regex = combined
+        entries_by_priority = {entry.priority: entry for entry in self.__regex_entries}
+        for name, group_index in combined.groupindex.items():
+            if name.startswith(_REGEX_GROUP_PREFIX):
+                self.__combined_groups[group_index] = entries_by_priority[int(name[len(_REGEX_GROUP_PREFIX):])]
+
+    @staticmethod
+    def __can_combine(pattern: re.Pattern[str], group_names: set) -> bool:
+        if not isinstance(pattern.pattern, str) or pattern.flags & _UNSUPPORTED_REGEX_FLAGS:
+            return False
+        if re.search(_BACKREFERENCE, pattern.pattern):
+            return False
+        for name in pattern.groupindex:
+            if name in group_names or name.startswith(_REGEX_GROUP_PREFIX):
+                return False
+        return True
+
+    def route(self, search: str) -> Optional[_SearchRoute]:
+        candidates = self.__collect_candidates(search)
+
+        best: Optional[Tuple[_IndexEntry, Optional[int]]] = None
+        for entry, starting_index in candidates:
+            if best is not None and entry.priority > best[0].priority:
+                continue
+            if entry.fits_length(search, starting_index):
+                best = (entry, starting_index)
+
+        if self.__regex_entries and (best is None or self.__regex_entries[0].priority < best[0].priority):
+            if not self.__regexes_compiled:
+                self.__compile_regexes()
+            regex_route = self.__route_regex(search, best[0].priority if best is not None else None)
+            if regex_route is not None:
+                return regex_route
+
+        if best is None:
+            return None
+
+        entry, starting_index = best
+        return _SearchRoute(entry.search, entry.invoker, starting_index=starting_index, cache=entry.cache, debouncer=entry.debouncer)
+
+    def route_all(self, search: str) -> List[_SearchRoute]:
+        # Every handler that accepts the search, highest priority first, for plugins that merge several sources
+        matches: List[Tuple[int, _SearchRoute]] = []
+        for entry, starting_index in self.__collect_candidates(search):
+            if entry.fits_length(search, starting_index):
+                matches.append((entry.priority, _SearchRoute(entry.search, entry.invoker, starting_index=starting_index, cache=entry.cache, debouncer=entry.debouncer)))
+
+        if self.__regex_entries:
+            if not self.__regexes_compiled:
+                self.__compile_regexes()
+            # The combined pattern only names one winner, so each regex is matched on its own here
+            for entry in self.__regex_entries:
+                if not entry.fits_length(search):
+                    continue
+                match = self.__regex_patterns[entry.priority].match(search)
+                if match:
+                    matches.append((entry.priority, _SearchRoute(entry.search, entry.invoker, regex_match=match, cache=entry.cache, debouncer=entry.debouncer)))
+
+        matches.sort(key=lambda match: match[0])
+        return [route for _, route in matches]
+
+    def __collect_candidates(self, search: str) -> List[Tuple[_IndexEntry, Optional[int]]]:
+        candidates: List[Tuple[_IndexEntry, Optional[int]]] = []
+        folded: Optional[str] = None
+
+        for entry in self.__catch_all:
+            candidates.append((entry, None))
+
+        if self.__equal_exact:
+            for entry in self.__equal_exact.get(search, ()):
+                candidates.append((entry, len(entry.search.restrictions.equal_to)))
+
+        if self.__equal_folded:
+            folded = search.lower()
+            for entry in self.__equal_folded.get(folded, ()):
+                candidates.append((entry, len(entry.search.restrictions.equal_to)))
+
+        self.__prefix_exact.collect(search, candidates)
+        self.__prefix_folded.collect(folded if folded is not None else search.lower(), candidates)
+        return candidates
+
+    def __route_regex(self, search: str, before_priority: Optional[int]) -> Optional[_SearchRoute]:
+        if self.__combined_regex is not None:
+            combined_match = self.__combined_regex.match(search)
+            winner = self.__combined_groups[combined_match.lastindex] if combined_match is not None else None
+
+            if winner is not None and (before_priority is None or winner.priority < before_priority) and (
+                    self.__first_standalone_regex_priority is None or
+                    winner.priority < self.__first_standalone_regex_priority
+            ) and winner.fits_length(search):
+                return _SearchRoute(winner.search, winner.invoker, regex_match=self.__regex_patterns[winner.priority].match(search), cache=winner.cache, debouncer=winner.debouncer)
+
+            if winner is None and self.__first_standalone_regex_priority is None:
+                return None
+
+        for entry in self.__regex_entries:
+            if before_priority is not None and entry.priority >= before_priority:
+                break
+            if not entry.fits_length(search):
+                continue
+            match = self.__regex_patterns[entry.priority].match(search)
+            if match:
+                return _SearchRoute(entry.search, entry.invoker, regex_match=match, cache=entry.cache, debouncer=entry.debouncer)
+
+        return None
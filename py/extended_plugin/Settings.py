@@ -0,0 +1,152 @@
+import dataclasses
+import re
+import typing
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Type
+
+from .RpcLogging import _logger
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_TRUE_STRINGS = frozenset(("true", "1", "yes", "on"))
+_FALSE_STRINGS = frozenset(("false", "0", "no", "off", ""))
+
+
+class _SettingsState:
+    __slots__ = ("settings_type", "fingerprint", "parsed", "version", "__parse")
+
+    def __init__(self, settings_type: Optional[Type] = None):
+        self.settings_type = settings_type
+        self.fingerprint: Optional[int] = None
+        self.parsed: Any = None
+        self.version = 0
+        self.__parse = _make_parser(settings_type)
+
+    def update(self, raw: Optional[Dict[str, Any]]) -> bool:
+        # Every query carries the whole settings dict; hashing it is far cheaper than parsing it again
+        fingerprint = _fingerprint(raw)
+        if fingerprint == self.fingerprint:
+            return False
+        try:
+            self.parsed = self.__parse(raw if raw is not None else {})
+        except Exception:
+            # Logged once per change rather than failing every query until the user fixes their settings
+            _logger.exception("Could not parse settings into %s, handlers get the raw settings instead", _type_name(self.settings_type))
+            self.parsed = MappingProxyType(dict(raw or {}))
+        self.fingerprint = fingerprint
+        self.version += 1
+        return True
+
+
+def _fingerprint(raw: Optional[Dict[str, Any]]) -> int:
+    if raw is None:
+        return hash(None)
+    try:
+        # Flat settings hash in one go
+        return hash(tuple(raw.items()))
+    except TypeError:
+        return hash(_hashable(raw))
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _make_parser(settings_type: Optional[Type]) -> Callable[[Mapping[str, Any]], Any]:
+    if settings_type is None:
+        return lambda raw: MappingProxyType(dict(raw))
+    if not dataclasses.is_dataclass(settings_type):
+        return settings_type
+
+    hints = typing.get_type_hints(settings_type)
+    fields = {field.name: hints.get(field.name) for field in dataclasses.fields(settings_type) if field.init}
+    read_only = None if settings_type.__dataclass_params__.frozen else _read_only_type(settings_type)
+
+    def parse(raw: Mapping[str, Any]) -> Any:
+        values = {}
+        for key, value in raw.items():
+            # Keys from SettingsTemplate.yaml are usually camelCase, dataclass fields snake_case
+            name = key if key in fields else _CAMEL_BOUNDARY.sub("_", key).lower()
+            if name not in fields:
+                continue
+            try:
+                values[name] = _coerce(value, fields[name])
+            except (TypeError, ValueError):
+                _logger.warning("Ignoring setting %s, %r is not a valid %s", key, value, fields[name])
+        settings = settings_type(**values)
+        if read_only is not None:
+            # Every handler shares the parsed settings, none of them gets to change them for the others
+            settings.__class__ = read_only
+        return settings
+
+    return parse
+
+
+def _read_only_type(settings_type: Type) -> Type:
+    def refuse_set(self, name: str, value: Any):
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {name!r}, settings are read-only")
+
+    def refuse_delete(self, name: str):
+        raise dataclasses.FrozenInstanceError(f"cannot delete field {name!r}, settings are read-only")
+
+    def copy(cls, *args: Any, **kwargs: Any):
+        # dataclasses.replace() hands out an ordinary, writable copy
+        return settings_type(*args, **kwargs)
+
+    def equals(self, other: Any):
+        # The generated __eq__ only compares instances of exactly the same class
+        if isinstance(other, settings_type):
+            return _field_values(self) == _field_values(other)
+        return NotImplemented
+
+    def reduce(self):
+        # Pickled for process executors as the plain settings type, which the other side can import
+        return _rebuild_settings, (settings_type, _field_values(self, init_only=True))
+
+    return type(settings_type.__name__, (settings_type,), {
+        "__slots__": (),
+        "__new__": copy,
+        "__module__": settings_type.__module__,
+        "__qualname__": settings_type.__qualname__,
+        "__setattr__": refuse_set,
+        "__delattr__": refuse_delete,
+        "__reduce__": reduce,
+        "__eq__": equals if settings_type.__dataclass_params__.eq else settings_type.__eq__,
+        "__hash__": settings_type.__hash__,
+    })
+
+
+def _field_values(settings: Any, init_only: bool = False) -> Dict[str, Any]:
+    return {field.name: getattr(settings, field.name) for field in dataclasses.fields(settings) if field.init or not init_only}
+
+
+def _rebuild_settings(settings_type: Type, values: Dict[str, Any]) -> Any:
+    return settings_type(**values)
+
+
+def _type_name(settings_type: Optional[Type]) -> str:
+    return getattr(settings_type, "__qualname__", repr(settings_type))
+
+
+def _coerce(value: Any, hint: Any) -> Any:
+    # Text boxes in the settings panel hand over strings, whatever the setting means
+    if not isinstance(value, str):
+        return value
+    if typing.get_origin(hint) is typing.Union:
+        arguments = [argument for argument in typing.get_args(hint) if argument is not type(None)]
+        if len(arguments) != 1:
+            return value
+        hint = arguments[0]
+    if hint is bool:
+        lowered = value.strip().lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+        raise ValueError(value)
+    if hint is int or hint is float:
+        return hint(value.strip())
+    return value
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+_FILETIME_UNIX_EPOCH = 11644473600
+
+
+class _StartupTimings:
+    def __init__(self):
+        self.__origin = time.perf_counter()
+        self.__origin_wall_time = time.time()
+        self.__marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> bool:
+        # Only the first occurrence counts, later requests are not part of startup
+        if name in self.__marks:
+            return False
+        self.__marks[name] = time.perf_counter()
+        return True
+
+    def report(self) -> Dict[str, float]:
+        # Milliseconds since the process was created, or since the package was imported where that is unknown
+        started = _process_start_time()
+        offset = self.__origin_wall_time - started if started is not None else 0.0
+        return {name: round((offset + at - self.__origin) * 1000, 2) for name, at in self.__marks.items()}
+
+
+def _process_start_time() -> Optional[float]:
+    try:
+        if sys.platform == "win32":
+            return _windows_process_start_time()
+        if sys.platform.startswith("linux"):
+            return _linux_process_start_time()
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return None
+
+
+def _windows_process_start_time() -> Optional[float]:
+    import ctypes
+    from ctypes import wintypes
+
+    creation, exit_time, kernel_time, user_time = (wintypes.FILETIME() for _ in range(4))
+    kernel32 = ctypes.windll.kernel32
+    if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation), ctypes.byref(exit_time), ctypes.byref(kernel_time), ctypes.byref(user_time)):
+        return None
+    # FILETIME counts 100 ns intervals since 1601
+    return ((creation.dwHighDateTime << 32) | creation.dwLowDateTime) / 10_000_000 - _FILETIME_UNIX_EPOCH
+
+
+def _linux_process_start_time() -> float:
+    with open("/proc/self/stat") as stat:
+        # The command name may contain spaces, so fields are counted from the closing parenthesis
+        start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+    # Start ticks count from boot, and btime in /proc/stat is only accurate to the second
+    age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    return time.time() - age
+
+
+_startup_timings = _StartupTimings()
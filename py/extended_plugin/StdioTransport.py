@@ -0,0 +1,107 @@
+import asyncio
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Optional, BinaryIO, Union
+
+from .Framing import Framing, _DetectedFraming
+from .Metrics import _metrics
+
+_READ_LIMIT = 64 * 1024 * 1024
+_READ_CHUNK_SIZE = 64 * 1024
+_CLOSE = object()
+
+
+class _StdioTransport:
+    def __init__(self, stdin: Optional[BinaryIO] = None, stdout: Optional[BinaryIO] = None, framing: Optional[Framing] = None):
+        self.__stdin = stdin if stdin is not None else sys.stdin.buffer
+        self.__stdout = stdout if stdout is not None else sys.stdout.buffer
+        self.__framing = framing if framing is not None else _DetectedFraming()
+        self.__reader: Optional[asyncio.StreamReader] = None
+        self.__outgoing: queue.SimpleQueue = queue.SimpleQueue()
+        self.__writer_thread: Optional[threading.Thread] = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=_READ_LIMIT, loop=loop)
+
+        try:
+            if self.__stdin.isatty():
+                # A terminal shares its file description with stdout, which must stay blocking
+                raise ValueError("stdin is a terminal")
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), self.__stdin)
+        except (NotImplementedError, OSError, ValueError):
+            # Windows pipes and regular files cannot be registered with the event loop
+            threading.Thread(target=self.__pump_stdin, args=(loop, reader), name="stdin-reader", daemon=True).start()
+
+        self.__reader = reader
+        self.__writer_thread = threading.Thread(target=self.__drain_outgoing, name="stdout-writer", daemon=True)
+        self.__writer_thread.start()
+
+    async def read_message(self) -> Optional[bytes]:
+        return await self.__framing.read(self.__reader)
+
+    def write(self, message: bytes):
+        for chunk in self.__framing.frame(message):
+            self.__outgoing.put(chunk)
+
+    def write_parts(self, parts: Iterable[Union[bytes, memoryview]]) -> int:
+        # Parts are queued as soon as they exist, nothing else is queued in between since only the event loop writes
+        size = 0
+        for part in self.__framing.frame_parts(parts):
+            self.__outgoing.put(part)
+            size += len(part)
+        return size
+
+    def close(self):
+        if self.__writer_thread is None:
+            return
+        self.__outgoing.put(_CLOSE)
+        self.__writer_thread.join()
+        self.__writer_thread = None
+
+    def __pump_stdin(self, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader):
+        read = getattr(self.__stdin, "read1", self.__stdin.read)
+        try:
+            while True:
+                chunk = read(_READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                loop.call_soon_threadsafe(reader.feed_data, chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                loop.call_soon_threadsafe(reader.feed_eof)
+            except RuntimeError:
+                pass
+
+    def __drain_outgoing(self):
+        closing = False
+        while not closing:
+            chunks = [self.__outgoing.get()]
+            # Everything queued since the last write goes out with a single flush
+            while True:
+                try:
+                    chunks.append(self.__outgoing.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _CLOSE in chunks:
+                closing = True
+                chunks = [chunk for chunk in chunks if chunk is not _CLOSE]
+
+            if not chunks:
+                continue
+
+            started = time.perf_counter()
+            try:
+                self.__stdout.writelines(chunks)
+                self.__stdout.flush()
+            except (OSError, ValueError):
+                return
+            # Time spent blocked on the pipe, which is how long the host takes to read what was sent
+            _metrics.observe_duration("transport.write", time.perf_counter() - started)
+            _metrics.observe_size("transport.write_bytes", sum(map(len, chunks)))
+            _metrics.increment("transport.flushes")
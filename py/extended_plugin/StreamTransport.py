@@ -0,0 +1,67 @@
+import asyncio
+import sys
+from typing import Iterable, Optional, Tuple, Union
+
+from .Framing import Framing, _DetectedFraming
+
+_READ_LIMIT = 64 * 1024 * 1024
+
+
+class _StreamTransport:
+    # Messages over an asyncio stream, such as a connection accepted by the plugin host
+    def __init__(self, reader: Optional[asyncio.StreamReader], writer: Optional[asyncio.StreamWriter], framing: Optional[Framing] = None):
+        self.__reader = reader
+        self.__writer = writer
+        self.__framing = framing if framing is not None else _DetectedFraming()
+
+    async def open(self):
+        pass
+
+    async def read_message(self) -> Optional[bytes]:
+        try:
+            # While the peer is not reading, this side stops taking on work instead of buffering replies without limit
+            await self.__writer.drain()
+            return await self.__framing.read(self.__reader)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            return None
+
+    def write(self, message: bytes):
+        # The event loop sends buffered data on its own, read_message waits for it to drain before the next request
+        self.__writer.writelines(self.__framing.frame(message))
+
+    def write_parts(self, parts: Iterable[Union[bytes, memoryview]]) -> int:
+        size = 0
+        for part in self.__framing.frame_parts(parts):
+            self.__writer.write(part)
+            size += len(part)
+        return size
+
+    def close(self):
+        if self.__writer is not None and not self.__writer.is_closing():
+            self.__writer.close()
+
+    def _attach(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__reader = reader
+        self.__writer = writer
+
+
+class _SocketTransport(_StreamTransport):
+    # Connects to a local test host or an out-of-process host instead of using stdin and stdout
+    def __init__(self, address: str, framing: Optional[Framing] = None):
+        super().__init__(None, None, framing)
+        self.__address = address
+
+    async def open(self):
+        self._attach(*await _open_connection(self.__address))
+
+
+async def _open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, _, location = address.partition(":")
+    if kind == "unix":
+        if sys.platform == "win32":
+            raise ValueError("Unix sockets are not available on Windows")
+        return await asyncio.open_unix_connection(location, limit=_READ_LIMIT)
+    if kind == "tcp":
+        host, _, port = location.rpartition(":")
+        return await asyncio.open_connection(host or "127.0.0.1", int(port), limit=_READ_LIMIT)
+    raise ValueError(f"address must look like unix:<path> or tcp:<host>:<port>, not {address!r}")
@@ -0,0 +1,36 @@
+import os
+from typing import Iterable, Optional, Protocol, Union
+
+from .Framing import _create_framing
+
+# Let a test host attach to a plugin it did not start with its own stdio
+_ADDRESS_VARIABLE = "EXTENDED_PLUGIN_ADDRESS"
+_FRAMING_VARIABLE = "EXTENDED_PLUGIN_FRAMING"
+
+
+class _Transport(Protocol):
+    async def open(self):
+        ...
+
+    async def read_message(self) -> Optional[bytes]:
+        ...
+
+    def write(self, message: bytes):
+        ...
+
+    def write_parts(self, parts: Iterable[Union[bytes, memoryview]]) -> int:
+        ...
+
+    def close(self):
+        ...
+
+
+def _create_transport(address: Optional[str], framing: str) -> _Transport:
+    address = os.environ.get(_ADDRESS_VARIABLE) or address
+    framing = _create_framing(os.environ.get(_FRAMING_VARIABLE) or framing)
+    if address is None:
+        from .StdioTransport import _StdioTransport
+        return _StdioTransport(framing=framing)
+
+    from .StreamTransport import _SocketTransport
+    return _SocketTransport(address, framing)
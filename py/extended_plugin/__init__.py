@@ -1,7 +1,38 @@
-from .Plugin import Plugin
-from .datatypes.SearchResults import SearchResults
-from .datatypes.Query import Query
-from .datatypes.RegexQuery import RegexQuery
-from .datatypes.Result import Result
-from .datatypes.ResultPreview import ResultPreview
-from .CancellationToken import CancellationToken
+from typing import TYPE_CHECKING
+
+from .StartupTimings import _startup_timings
+from .LazyExports import _install_lazy_exports
+
+if TYPE_CHECKING:
+    from .Plugin import Plugin
+    from .datatypes.SearchResults import SearchResults
+    from .datatypes.Query import Query
+    from .datatypes.RegexQuery import RegexQuery
+    from .datatypes.Result import Result
+    from .datatypes.ResultPreview import ResultPreview
+    from .CancellationToken import CancellationToken
+    from .FuzzyMatcher import FuzzyMatcher, FuzzyMatch
+    from .FlowApi import FlowApi
+    from .JsonRpcError import JsonRpcError, RequestTimeoutError
+    from .PluginHost import PluginHost
+    from .PluginRelay import run_relay
+
+_startup_timings.mark("import")
+
+# Exports are imported on first access, so a plugin process only pays for the parts it uses
+_install_lazy_exports(__name__, {
+    "Plugin": ".Plugin",
+    "SearchResults": ".datatypes.SearchResults",
+    "Query": ".datatypes.Query",
+    "RegexQuery": ".datatypes.RegexQuery",
+    "Result": ".datatypes.Result",
+    "ResultPreview": ".datatypes.ResultPreview",
+    "CancellationToken": ".CancellationToken",
+    "FuzzyMatcher": ".FuzzyMatcher",
+    "FuzzyMatch": ".FuzzyMatcher",
+    "FlowApi": ".FlowApi",
+    "JsonRpcError": ".JsonRpcError",
+    "RequestTimeoutError": ".JsonRpcError",
+    "PluginHost": ".PluginHost",
+    "run_relay": ".PluginRelay",
+})
@@ -1,15 +1,17 @@
 from dataclasses import dataclass
 from typing import List, Any, Optional
+from ._Slots import _SLOTS
 
-@dataclass
+@dataclass(**_SLOTS)
 class ActionData:
-    def __init__(self, callback_name: str, method_name: str, data: Optional[List[Any]] = None):
-        if data is None:
-            data = []
-        self.callback_name = callback_name
-        self.method_name = method_name
-        self.data = data
-        self.hide = True
+    callback_name: str
+    method_name: str
+    data: Optional[List[Any]] = None
+    hide: bool = True
+
+    def __post_init__(self):
+        if self.data is None:
+            self.data = []
 
     def to_dict(self):
         return {
@@ -19,4 +21,4 @@ class ActionData:
 
     def dont_hide(self):
         self.hide = False
-        return self
\ No newline at end of file
+        return self
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 from typing import Optional, List, Any
 from .NativeResultPreview import NativeResultPreview
+from ._Slots import _SLOTS
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class NativeResult:
     title: Optional[str]
     subtitle: Optional[str]
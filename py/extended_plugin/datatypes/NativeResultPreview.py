@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 from typing import Optional
+from ._Slots import _SLOTS
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class NativeResultPreview:
     previewImagePath: Optional[str]
     isMedia: Optional[bool]
@@ -1,11 +1,35 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, List
 
+from ._Slots import _SLOTS
 
-@dataclass(frozen=True)
+_set = object.__setattr__
+
+
+@dataclass(frozen=True, **_SLOTS)
 class Query:
     raw: str
     is_requery: bool
     search: str
     search_terms: List[str]
-    action_keyword: str
\ No newline at end of file
+    action_keyword: str
+
+    @classmethod
+    def _from_host(cls, raw: str, is_requery: bool, action_keyword: str, source: str, starting_index: int = 0, **fields: Any) -> "Query":
+        # Made for every keystroke, so search_terms is left unset until a handler actually reads it
+        query = cls.__new__(cls)
+        _set(query, "raw", raw)
+        _set(query, "is_requery", is_requery)
+        _set(query, "search", (source[starting_index:] if starting_index else source).strip())
+        _set(query, "action_keyword", action_keyword)
+        for name, value in fields.items():
+            _set(query, name, value)
+        return query
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes that were never set, which on a query from the host is search_terms
+        if name != "search_terms":
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        search_terms = [term for term in self.search.split(" ") if term]
+        _set(self, "search_terms", search_terms)
+        return search_terms
@@ -1,8 +1,75 @@
-from dataclasses import dataclass
 import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+
 from .Query import Query
+from ._Slots import _SLOTS
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class RegexQuery(Query):
     regex_matches: re.Match[str]
+
+    def __reduce__(self):
+        # re.Match cannot be pickled, process handlers get a snapshot with the same accessors
+        matches = self.regex_matches
+        if isinstance(matches, re.Match):
+            matches = _MatchSnapshot.of(matches)
+        return self.__class__, (self.raw, self.is_requery, self.search, self.search_terms, self.action_keyword, matches)
+
+
+class _MatchSnapshot:
+    # The parts of re.Match a handler reads, kept as the string and the span of every group
+    __slots__ = ("string", "re", "pos", "endpos", "regs", "lastindex", "lastgroup")
+
+    def __init__(self, string: str, pattern: re.Pattern, pos: int, endpos: int, regs: Tuple[Tuple[int, int], ...], lastindex: Optional[int], lastgroup: Optional[str]):
+        self.string = string
+        self.re = pattern
+        self.pos = pos
+        self.endpos = endpos
+        self.regs = regs
+        self.lastindex = lastindex
+        self.lastgroup = lastgroup
+
+    @classmethod
+    def of(cls, match: re.Match) -> "_MatchSnapshot":
+        return cls(match.string, match.re, match.pos, match.endpos, match.regs, match.lastindex, match.lastgroup)
+
+    def __index(self, group: Union[int, str]) -> int:
+        index = self.re.groupindex[group] if isinstance(group, str) else group
+        if not 0 <= index < len(self.regs):
+            raise IndexError("no such group")
+        return index
+
+    def __value(self, index: int, default: Any = None) -> Any:
+        start, end = self.regs[index]
+        return self.string[start:end] if start >= 0 else default
+
+    def group(self, *groups: Union[int, str]) -> Any:
+        if len(groups) <= 1:
+            return self.__value(self.__index(groups[0] if groups else 0))
+        return tuple(self.__value(self.__index(group)) for group in groups)
+
+    def __getitem__(self, group: Union[int, str]) -> Any:
+        return self.group(group)
+
+    def groups(self, default: Any = None) -> Tuple[Any, ...]:
+        return tuple(self.__value(index, default) for index in range(1, len(self.regs)))
+
+    def groupdict(self, default: Any = None) -> Dict[str, Any]:
+        return {name: self.__value(index, default) for name, index in self.re.groupindex.items()}
+
+    def span(self, group: Union[int, str] = 0) -> Tuple[int, int]:
+        return self.regs[self.__index(group)]
+
+    def start(self, group: Union[int, str] = 0) -> int:
+        return self.span(group)[0]
+
+    def end(self, group: Union[int, str] = 0) -> int:
+        return self.span(group)[1]
+
+    def __reduce__(self):
+        return self.__class__, (self.string, self.re, self.pos, self.endpos, self.regs, self.lastindex, self.lastgroup)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} span={self.span()!r}, match={self.group()!r}>"
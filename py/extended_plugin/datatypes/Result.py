@@ -1,13 +1,14 @@
 from dataclasses import dataclass
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Callable, Awaitable
 from .ActionData import ActionData
 from .ResultPreview import ResultPreview
+from ._Slots import _SLOTS
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .SearchResults import SearchResults
 
-@dataclass
+@dataclass(**_SLOTS)
 class Result:
     title: Optional[str] = None
     subtitle: Optional[str] = None
@@ -23,4 +24,5 @@ class Result:
     progress: Optional[int] = None
     progress_bar_color: Optional[str] = None
     preview: Optional[ResultPreview] = None
-    context_menu: Optional['SearchResults'] = None
\ No newline at end of file
+    # Either the menu itself, or a callable that builds it (sync or async) when the user opens it
+    context_menu: Optional[Union['SearchResults', Callable[[], Union['SearchResults', Awaitable['SearchResults']]]]] = None
\ No newline at end of file
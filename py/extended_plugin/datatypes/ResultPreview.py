@@ -1,7 +1,8 @@
 from dataclasses import dataclass
 from typing import Optional
+from ._Slots import _SLOTS
 
-@dataclass
+@dataclass(**_SLOTS)
 class ResultPreview:
     preview_image_path: Optional[str] = None
     is_media: Optional[bool] = None
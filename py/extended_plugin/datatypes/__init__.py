@@ -1,9 +1,14 @@
-from ._InitRequestData import _InitRequestData
-from ._OriginalQueryData import _OriginalQueryData
-from ._OriginalPluginMetadata import _OriginalPluginMetadata
-from .Metadata import Metadata
-from .Query import Query
-from .RegexQuery import RegexQuery
+from typing import TYPE_CHECKING
+
+from ..LazyExports import _install_lazy_exports
+
+if TYPE_CHECKING:
+    from ._InitRequestData import _InitRequestData
+    from ._OriginalQueryData import _OriginalQueryData
+    from ._OriginalPluginMetadata import _OriginalPluginMetadata
+    from .Metadata import Metadata
+    from .Query import Query
+    from .RegexQuery import RegexQuery
 
 __all__ = [
     "_InitRequestData",
@@ -12,4 +17,13 @@ __all__ = [
     "Metadata",
     "Query",
     "RegexQuery",
-]
\ No newline at end of file
+]
+
+_install_lazy_exports(__name__, {
+    "_InitRequestData": "._InitRequestData",
+    "_OriginalQueryData": "._OriginalQueryData",
+    "_OriginalPluginMetadata": "._OriginalPluginMetadata",
+    "Metadata": ".Metadata",
+    "Query": ".Query",
+    "RegexQuery": ".RegexQuery",
+})
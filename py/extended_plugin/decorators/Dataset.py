@@ -0,0 +1,192 @@
+import asyncio
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, Union
+
+from ..RpcLogging import _logger
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from ..DatasetStore import _Snapshot
+
+_DEFAULT_CHECK_INTERVAL = 5000
+
+Sources = Union[Iterable[str], Callable[[Any], Iterable[str]]]
+
+
+class _DatasetState:
+    __slots__ = ("lock", "snapshot", "checked_at", "rebuilding", "loading")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot: Optional["_Snapshot"] = None
+        self.checked_at = 0.0
+        self.rebuilding = False
+        self.loading: Optional["Future"] = None
+
+
+class _Dataset:
+    def __init__(
+            self,
+            loader: Callable[[Any], Any],
+            version: Any = 1,
+            sources: Optional[Sources] = None,
+            max_age: Optional[int] = None,
+            check_interval: Optional[int] = None,
+            placeholder: Any = None,
+    ):
+        self.__loader = loader
+        self.__version = version
+        self.__sources = sources
+        self.__max_age = max_age
+        self.__check_interval = (check_interval if check_interval is not None else _DEFAULT_CHECK_INTERVAL) / 1000  # Convert milliseconds to seconds
+        self.__placeholder = placeholder
+        self.__name = loader.__name__
+        self.__doc__ = loader.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.__name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        state = self.__state(instance)
+        snapshot = state.snapshot
+        if snapshot is None:
+            if _on_event_loop():
+                # Loading can take as long as the loader does, the loop answers with the placeholder until then
+                self.__start_load(instance, state)
+                return self.__placeholder
+            # Nothing in memory yet: read the last snapshot from disk, or build it right here if there is none
+            snapshot = self.__load_once(instance, state)
+        elif time.monotonic() - state.checked_at >= self.__check_interval:
+            self.__refresh_if_stale(instance, state)
+
+        return snapshot.data
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"Dataset {self.__name!r} is read-only, call refresh() to rebuild it")
+
+    def warm_up(self, instance):
+        self.__load_once(instance, self.__state(instance))
+
+    async def ready(self, instance) -> Any:
+        # For handlers on the event loop that need the data rather than the placeholder
+        state = self.__state(instance)
+        if state.snapshot is None:
+            await asyncio.wrap_future(self.__start_load(instance, state))
+        return self.__get__(instance)
+
+    def refresh(self, instance, wait: bool = False):
+        state = self.__state(instance)
+        if wait:
+            self.__rebuild(instance, state)
+        else:
+            self.__start_rebuild(instance, state)
+
+    def __state(self, instance) -> _DatasetState:
+        key = f"_dataset_{self.__name}"
+        state = instance.__dict__.get(key)
+        if state is None:
+            state = instance.__dict__.setdefault(key, _DatasetState())
+        return state
+
+    def __path(self, instance) -> str:
+        return os.path.join(instance._Plugin__get_dataset_directory(), f"{self.__name}.dataset")
+
+    def __current_sources(self, instance):
+        from ..DatasetStore import _source_mtimes
+
+        sources = self.__sources
+        if sources is None:
+            return {}
+        if callable(sources):
+            sources = sources(instance)
+        return _source_mtimes(sources)
+
+    def __start_load(self, instance, state: _DatasetState) -> "Future":
+        loading = state.loading
+        if loading is None:
+            loading = state.loading = instance._Plugin__executors.thread_pool.submit(self.__load_once, instance, state)
+            # A failed load is tried again by the next read
+            loading.add_done_callback(lambda _: setattr(state, "loading", None))
+        return loading
+
+    def __load_once(self, instance, state: _DatasetState) -> "_Snapshot":
+        with state.lock:
+            if state.snapshot is None:
+                self.__load(instance, state)
+            return state.snapshot
+
+    def __load(self, instance, state: _DatasetState):
+        # The snapshot store (pickle, mmap) is imported by the first dataset that is read, not with the plugin
+        from ..DatasetStore import _read_snapshot
+
+        snapshot = _read_snapshot(self.__path(instance), self.__version)
+        if snapshot is None:
+            self.__rebuild(instance, state)
+            return
+
+        state.snapshot = snapshot
+        self.__refresh_if_stale(instance, state)
+
+    def __refresh_if_stale(self, instance, state: _DatasetState):
+        state.checked_at = time.monotonic()
+        if state.snapshot.is_stale(self.__current_sources(instance), self.__max_age):
+            self.__start_rebuild(instance, state)
+
+    def __start_rebuild(self, instance, state: _DatasetState):
+        if state.rebuilding:
+            return
+        state.rebuilding = True
+        # The previous snapshot keeps being served until the new one is ready
+        instance._Plugin__executors.thread_pool.submit(self.__rebuild, instance, state)
+
+    def __rebuild(self, instance, state: _DatasetState):
+        from ..DatasetStore import _Snapshot, _write_snapshot
+
+        state.rebuilding = True
+        try:
+            # Sources are read before loading, so changes made while it runs trigger another rebuild
+            sources = self.__current_sources(instance)
+            snapshot = _Snapshot(self.__version, sources, time.time(), self.__loader(instance))
+            state.snapshot = snapshot
+            state.checked_at = time.monotonic()
+            try:
+                _write_snapshot(self.__path(instance), snapshot)
+            except Exception:
+                _logger.warning("Could not write dataset %s to disk", self.__name, exc_info=True)
+        except Exception:
+            if state.snapshot is None:
+                raise
+            _logger.exception("Rebuilding dataset %s failed, keeping the previous snapshot", self.__name)
+        finally:
+            state.rebuilding = False
+
+
+def dataset_decorator(
+        func: Optional[Callable] = None,
+        version: Any = 1,
+        sources: Optional[Sources] = None,
+        max_age: Optional[int] = None,
+        check_interval: Optional[int] = None,
+        placeholder: Any = None,
+):
+    def actual_decorator(func2):
+        return _Dataset(func2, version=version, sources=sources, max_age=max_age, check_interval=check_interval, placeholder=placeholder)
+
+    if func is not None:
+        return actual_decorator(func)
+    else:
+        return actual_decorator
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
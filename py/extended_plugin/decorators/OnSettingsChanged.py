@@ -0,0 +1,53 @@
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+class _OnSettingsChanged:
+    def __init__(self, hook: Callable[[Any, Any], Any], eager: bool = False):
+        self.__hook = hook
+        self.__eager = eager
+        self.__name = hook.__name__
+        self.__lock = threading.Lock()
+        self.__doc__ = hook.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.__name = name
+
+    @property
+    def is_eager(self) -> bool:
+        return self.__eager
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        key = f"_settings_{self.__name}"
+        version = instance._Plugin__settings.version
+        memo: Optional[Tuple[int, Any]] = instance.__dict__.get(key)
+        if memo is not None and memo[0] == version:
+            return memo[1]
+
+        # Handlers on worker threads may ask at the same time, the hook still runs once per change
+        with self.__lock:
+            memo = instance.__dict__.get(key)
+            if memo is not None and memo[0] == version:
+                return memo[1]
+            value = self.__hook(instance, instance._Plugin__settings.parsed)
+            instance.__dict__[key] = (version, value)
+            return value
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"{self.__name!r} is derived from the settings and cannot be assigned")
+
+    def refresh(self, instance):
+        self.__get__(instance)
+
+
+def on_settings_changed_decorator(func: Optional[Callable] = None, eager: bool = False):
+    def actual_decorator(func2):
+        return _OnSettingsChanged(func2, eager=eager)
+
+    if func is not None:
+        return actual_decorator(func)
+    else:
+        return actual_decorator
@@ -1,7 +1,11 @@
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional, Callable
 import re
 
+from ..Executors import EXECUTION_MODES, EXECUTION_PROCESS, EXECUTION_THREAD
+from ..HandlerInvoker import _HandlerInvoker
+
 def search_decorator_stub(
             func: Optional[Callable] = None,
             starts_with: Optional[str] = None,
@@ -10,8 +14,15 @@ def search_decorator_stub(
             min_length: Optional[int] = None,
             max_length: Optional[int] = None,
             debounce_delay: Optional[int] = None,
+            adaptive_debounce: Optional[bool] = None,
             regex: Optional[str] = None,
-            regex_options: Optional[re.RegexFlag] = re.IGNORECASE
+            regex_options: Optional[re.RegexFlag] = re.IGNORECASE,
+            cache_size: Optional[int] = None,
+            cache_ttl: Optional[int] = None,
+            refine_results: Optional[bool] = None,
+            execution: Optional[str] = None,
+            max_results: Optional[int] = None,
+            timeout: Optional[int] = None
     ):
     pass
 
@@ -24,24 +35,59 @@ def create_search_decorator(plugin):
             min_length: Optional[int] = None,
             max_length: Optional[int] = None,
             debounce_delay: Optional[int] = None,
+            adaptive_debounce: Optional[bool] = None,
             regex: Optional[str] = None,
-            regex_options: Optional[re.RegexFlag] = re.IGNORECASE
+            regex_options: Optional[re.RegexFlag] = re.IGNORECASE,
+            cache_size: Optional[int] = None,
+            cache_ttl: Optional[int] = None,
+            refine_results: Optional[bool] = None,
+            execution: Optional[str] = None,
+            max_results: Optional[int] = None,
+            timeout: Optional[int] = None
     ):
+        if execution is not None and execution not in EXECUTION_MODES:
+            raise ValueError(f"execution must be one of {', '.join(EXECUTION_MODES)}, not {execution!r}")
+        if max_results is not None and max_results < 1:
+            raise ValueError(f"max_results must be at least 1, not {max_results!r}")
+
         def actual_decorator(func2):
+            invoker = _HandlerInvoker.for_search(
+                func2,
+                is_method=execution != EXECUTION_PROCESS,
+                execution=execution,
+                is_regex=regex is not None
+            )
+            # Coroutines already run on the event loop, a pool has nothing to run them on
+            if execution in (EXECUTION_THREAD, EXECUTION_PROCESS) and (invoker.is_async or invoker.is_async_generator):
+                raise ValueError(f"execution={execution!r} needs a synchronous handler, {func2.__name__} is async")
+
+            restrictions = SearchRestrictions(
+                starts_with=starts_with,
+                equal_to=equal_to,
+                case_sensitive=case_sensitive,
+                min_length=min_length,
+                max_length=max_length,
+                debounce_delay=debounce_delay,
+                adaptive_debounce=adaptive_debounce,
+                regex=regex,
+                regex_options=regex_options,
+                cache_size=cache_size,
+                cache_ttl=cache_ttl,
+                refine_results=refine_results,
+                execution=execution,
+                max_results=max_results,
+                timeout=timeout
+            )
+            # An invalid pattern raises re.error right here; the search index reuses the compiled pattern later
+            restrictions.compiled_regex
+
             # noinspection PyProtectedMember
             # noinspection PyUnresolvedReferences
-            plugin._Plugin__searches.append(
+            plugin._Plugin__pending_searches.append(
                 SearchRestrictionsAndHandler(
-                    restrictions=SearchRestrictions(
-                        starts_with=starts_with,
-                        equal_to=equal_to,
-                        case_sensitive=case_sensitive,
-                        min_length=min_length,
-                        max_length=max_length,
-                        debounce_delay=debounce_delay,
-                        regex=re.compile(regex, regex_options) if regex is not None else None
-                    ),
-                    handler=func2
+                    restrictions=restrictions,
+                    handler=func2,
+                    invoker=invoker
                 )
             )
             return func2
@@ -62,10 +108,36 @@ class SearchRestrictions:
     min_length: Optional[int]
     max_length: Optional[int]
     debounce_delay: Optional[int]
-    regex: Optional[re.Pattern[str]]
+    regex: Optional[str]
+    regex_options: Optional[re.RegexFlag] = re.IGNORECASE
+    cache_size: Optional[int] = None
+    cache_ttl: Optional[int] = None
+    refine_results: Optional[bool] = None
+    # Process handlers run outside the plugin instance, so they are plain functions without `self`
+    execution: Optional[str] = None
+    # With adaptive debouncing, `debounce_delay` is the longest a query is held back
+    adaptive_debounce: Optional[bool] = None
+    # Only this many results, the highest scored, are sent to the host
+    max_results: Optional[int] = None
+    # Milliseconds the handler may take before whatever it streamed so far is used instead
+    timeout: Optional[int] = None
+
+    # Compiled once by the decorator; only combining all patterns into one alternation waits for the search index
+    @cached_property
+    def compiled_regex(self) -> Optional[re.Pattern[str]]:
+        return re.compile(self.regex, self.regex_options or 0) if self.regex is not None else None
+
+    @property
+    def is_debounced(self) -> bool:
+        return self.debounce_delay is not None or bool(self.adaptive_debounce)
+
+    @property
+    def is_cached(self) -> bool:
+        return self.cache_size is not None or self.cache_ttl is not None or bool(self.refine_results)
 
 
 @dataclass
 class SearchRestrictionsAndHandler:
     restrictions: Optional[SearchRestrictions]
     handler: callable
+    invoker: Optional[_HandlerInvoker] = None